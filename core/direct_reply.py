@@ -0,0 +1,83 @@
+"""Pre-LLM decision layer that answers trivial input without calling the model.
+
+Greetings, empty-ish and oversized messages get a fixed reply, and exact
+repeats of earlier messages are served from a small reply cache. Only input
+that gets past both checks needs a model round trip.
+
+Example:
+>>> from core.direct_reply import ReplyCache, direct_reply
+>>> direct_reply("hello!")
+'Hey there! What can I get you?'
+>>> cache = ReplyCache()
+>>> cache.put("What's on tap?", "Blue milk.")
+>>> cache.get("What's on tap?")
+'Blue milk.'
+"""
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+MIN_LENGTH = 3  # Shorter messages are treated as noise
+# Longer messages are refused rather than sent to the model. This must stay
+# below the server's RECV_CHUNK (4096 bytes), the most one message can hold.
+MAX_LENGTH = 2048
+
+GREETING_REPLY = "Hey there! What can I get you?"
+TOO_SHORT_REPLY = "Say again?"
+TOO_LONG_REPLY = "That's a lot to take in at once - mind keeping it shorter?"
+
+_GREETING_RE = re.compile(
+    r"(?:hi|hello|hey|hiya|howdy|yo|greetings|good (?:morning|afternoon|evening))[\s!.?]*",
+    re.IGNORECASE,
+)
+
+
+def direct_reply(message: str) -> Optional[str]:
+    """Return a canned reply for *message*, or ``None`` if the LLM is needed.
+
+    Args:
+        message: The user's message, already stripped of surrounding whitespace
+
+    Returns:
+        Optional[str]: The canned reply, or ``None`` to ask the model
+    """
+    if len(message) < MIN_LENGTH:
+        return TOO_SHORT_REPLY
+    if len(message) > MAX_LENGTH:
+        return TOO_LONG_REPLY
+    if _GREETING_RE.fullmatch(message):
+        return GREETING_REPLY
+    return None
+
+
+class ReplyCache:
+    """Thread-safe, size-bounded exact-match cache of model replies.
+
+    Args:
+        maxsize: Number of entries kept; the least recently used entry is
+            evicted first
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, message: str) -> Optional[str]:
+        """Return the cached reply for *message*, if any."""
+        with self._lock:
+            reply = self._entries.get(message)
+            if reply is not None:
+                self._entries.move_to_end(message)
+            return reply
+
+    def put(self, message: str, reply: str) -> None:
+        """Remember *reply* as the answer to *message*."""
+        with self._lock:
+            self._entries[message] = reply
+            self._entries.move_to_end(message)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -0,0 +1,130 @@
+"""Framing helpers shared by the socket chat scripts.
+
+Plain chat traffic is newline-delimited text. When the server is configured
+to compress broadcasts, each broadcast is instead wrapped in a binary frame::
+
+    +------+----------------+---------------------+
+    | kind | length (!I)    | body (length bytes) |
+    +------+----------------+---------------------+
+
+where *kind* is ``FRAME_RAW``, ``FRAME_ZLIB`` or ``FRAME_LZ4``. Payloads
+smaller than ``COMPRESS_MIN_BYTES`` are sent raw since compressing them saves
+nothing. Frames are compressed with the stdlib ``zlib``, which every peer can
+decode; ``lz4`` is used only when the sender opts in, since a receiver
+without ``lz4`` installed cannot decode those frames.
+
+The code here sticks to the statically typed subset of Python that *mypyc*
+understands, so the module can be compiled to a C extension
+(``mypyc core/framing.py``) wherever that toolchain is installed. Uncompiled,
+the byte scan itself still runs in C: ``bytearray.find`` is backed by
+``memchr``.
+
+Example:
+>>> from core.framing import frame_lines
+>>> frame_lines(bytearray(b"one\\ntwo\\npartial"), 0, 15)
+([b'one', b'two'], 8)
+"""
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import List, Tuple
+
+try:
+    import lz4.block as lz4_block
+except ImportError:  # optional dependency
+    lz4_block = None
+
+FRAME_RAW = 0
+FRAME_ZLIB = 1
+FRAME_LZ4 = 2
+COMPRESS_MIN_BYTES = 128  # Payloads smaller than this are not worth compressing
+
+_HEADER = struct.Struct("!BI")
+
+
+def frame_lines(buf: bytearray, start: int, end: int) -> Tuple[List[bytes], int]:
+    """Split the complete ``\\n``-terminated lines out of ``buf[start:end]``.
+
+    Args:
+        buf: Receive buffer holding raw bytes from the socket
+        start: Index of the first byte to scan
+        end: Index just past the last byte to scan
+
+    Returns:
+        tuple: ``(lines, cursor)`` where *lines* are the complete lines without
+        their terminator and *cursor* is the index just past the last
+        terminator consumed. Bytes from *cursor* to *end* form an incomplete
+        line that should be kept for the next read.
+    """
+    lines: List[bytes] = []
+    pos = start
+    while True:
+        nl = buf.find(b"\n", pos, end)
+        if nl < 0:
+            return lines, pos
+        lines.append(bytes(buf[pos:nl]))
+        pos = nl + 1
+
+
+def encode_frame(payload: bytes, min_size: int = COMPRESS_MIN_BYTES,
+                 use_lz4: bool = False) -> bytes:
+    """Wrap *payload* in a frame, compressing it if it is at least *min_size* bytes.
+
+    The frame is built once and can be sent unchanged to every recipient.
+
+    Args:
+        payload: Bytes to send
+        min_size: Smallest payload worth compressing
+        use_lz4: Compress with ``lz4`` (if installed) instead of ``zlib``;
+            only set it when every receiver has ``lz4`` too
+
+    Returns:
+        bytes: The frame header followed by the (possibly compressed) body
+    """
+    if len(payload) < min_size:
+        return _HEADER.pack(FRAME_RAW, len(payload)) + payload
+    if use_lz4 and lz4_block is not None:
+        body = lz4_block.compress(payload)
+        return _HEADER.pack(FRAME_LZ4, len(body)) + body
+    body = zlib.compress(payload, 1)
+    return _HEADER.pack(FRAME_ZLIB, len(body)) + body
+
+
+def decode_frames(buf: bytearray, start: int, end: int) -> Tuple[List[bytes], int]:
+    """Decode the complete frames in ``buf[start:end]``.
+
+    Args:
+        buf: Receive buffer holding raw bytes from the socket
+        start: Index of the first byte to decode
+        end: Index just past the last byte to decode
+
+    Returns:
+        tuple: ``(payloads, cursor)`` where *payloads* are the decompressed
+        frame bodies and *cursor* is the index just past the last complete
+        frame.
+
+    Raises:
+        ValueError: If a frame has an unknown kind, or is lz4-compressed and
+            ``lz4`` is not installed
+        zlib.error: If a zlib-compressed frame body is corrupt
+    """
+    payloads: List[bytes] = []
+    pos = start
+    header_size = _HEADER.size
+    while end - pos >= header_size:
+        kind, length = _HEADER.unpack_from(buf, pos)
+        body_start = pos + header_size
+        if end - body_start < length:
+            break
+        body = bytes(buf[body_start:body_start + length])
+        if kind == FRAME_RAW:
+            payloads.append(body)
+        elif kind == FRAME_ZLIB:
+            payloads.append(zlib.decompress(body))
+        elif kind == FRAME_LZ4 and lz4_block is not None:
+            payloads.append(lz4_block.decompress(body))
+        else:
+            raise ValueError(f"Cannot decode frame of kind {kind}")
+        pos = body_start + length
+    return payloads, pos
@@ -5,6 +5,7 @@ Launch a single IRC bot with the specified environment and bot name.
 This script is used by the test harness to start individual bots.
 """
 import asyncio
+import json
 import os
 import sys
 import argparse
@@ -39,6 +40,10 @@ def parse_args():
     parser.add_argument('--env', required=True, help='Environment name (e.g., cantina)')
     parser.add_argument('--bot', required=True, help='Bot name (without .yml extension)')
     parser.add_argument('--test-mode', action='store_true', help='Run in test mode')
+    parser.add_argument('--channel', help='Channel to join instead of the configured one')
+    parser.add_argument('--config-json-env', metavar='VAR',
+                        help='Environment variable holding the bot config as JSON; '
+                             'the config file is read only if it is unset')
     return parser.parse_args()
 
 async def run_bot(config):
@@ -58,12 +63,15 @@ def main():
     args = parse_args()
     
     # Load bot configuration
-    config_path = Path(f"environments/{args.env}/{args.bot}.yml")
-    if not config_path.exists():
-        logger.error(f"Configuration file not found: {config_path}")
-        return 1
-    
-    config = load_config(config_path)
+    if args.config_json_env and args.config_json_env in os.environ:
+        config = json.loads(os.environ[args.config_json_env])
+    else:
+        config_path = Path(f"environments/{args.env}/{args.bot}.yml")
+        if not config_path.exists():
+            logger.error(f"Configuration file not found: {config_path}")
+            return 1
+        
+        config = load_config(config_path)
     
     # Set test mode if specified
     if args.test_mode:
@@ -73,9 +81,37 @@ def main():
         config['port'] = 16667
         config['channels'] = ["#test-channel"]
     
+    if args.channel:
+        config['channel'] = args.channel
+    
+    return run(config)
+
+def run(config, log_path=None, start_new_session=False):
+    """Create and run a bot from an already loaded configuration.
+    
+    This is also the entry point for callers that fork bots from a running
+    interpreter instead of starting this script (see BotManager in
+    tests/conftest.py).
+    
+    Args:
+        config (dict): Bot configuration
+        log_path (str, optional): File to redirect stdout and stderr to
+        start_new_session (bool): Call setsid() first, like the Popen option
+        
+    Returns:
+        int: Exit status
+    """
+    if start_new_session:
+        os.setsid()
+    if log_path is not None:
+        fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.dup2(fd, 1)
+        os.dup2(fd, 2)
+        os.close(fd)
+    
     # Create and start the bot
     try:
-        asyncio.run(run_bot(config))
+        return asyncio.run(run_bot(config))
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
@@ -84,5 +120,13 @@ def main():
     
     return 0
 
+def run_process(config, log_path=None, start_new_session=False):
+    """multiprocessing target: run() the bot and exit with its status.
+    
+    A Process target's return value is discarded, so without this a bot
+    that failed would still report exit code 0.
+    """
+    sys.exit(run(config, log_path, start_new_session))
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -14,6 +14,8 @@ Example:
     ```
     python socket-client-ai.py --host 127.0.0.1 --port 65432
     ```
+
+    Pass ``--compressed`` when the server has ``COMPRESS_BROADCASTS`` enabled.
 """
 
 import socket
@@ -22,10 +24,14 @@ import time
 import random
 import select
 import argparse
-from typing import List, Dict, Any, Optional
+import zlib
+from collections import deque
+from typing import Deque, List, Dict, Any, Optional
 
 from openai import OpenAI
 
+from core.framing import decode_frames, frame_lines
+
 # Default connection settings
 HOST = '127.0.0.1'  # Default server host
 PORT = 65432        # Default server port
@@ -33,6 +39,9 @@ PORT = 65432        # Default server port
 # Network configuration
 RECV_CHUNK = 4096  # Maximum bytes to read per recv() call
 
+# Conversation configuration
+HISTORY_SIZE = 10  # Most recent messages kept as LLM context
+
 # Initialize OpenAI client with local Ollama server
 client = OpenAI(base_url="http://10.209.1.96:11434/v1", api_key="ollama")
 
@@ -48,10 +57,10 @@ def get_ai_reply(history: List[Dict[str, str]]) -> str:
         
     Example:
         >>> history = [
-        ...     {"role": "user", "content": "Hello"},
+        ...     {"role": "user", "content": "How is the weather on Tatooine?"},
         ... ]
         >>> get_ai_reply(history)
-        "Hello! How can I assist you today?"
+        "Hot and dry, as always - two suns will do that."
     """
     try:
         response = client.chat.completions.create(
@@ -64,8 +73,8 @@ def get_ai_reply(history: List[Dict[str, str]]) -> str:
     except Exception as e:
         return f"[AI error]: {e}"
 
-def receive_loop(sock: socket.socket, history: List[Dict[str, str]], 
-                lock: threading.Lock) -> None:
+def receive_loop(sock: socket.socket, history: Deque[Dict[str, str]],
+                lock: threading.Lock, compressed: bool = False) -> None:
     """Continuously receive and process data from the server.
     
     This function runs in a separate thread and handles incoming messages
@@ -74,32 +83,57 @@ def receive_loop(sock: socket.socket, history: List[Dict[str, str]],
     
     Args:
         sock: Connected socket to receive data from
-        history: List to store conversation history
-        lock: Thread lock to protect access to the history list
+        history: Bounded deque holding the most recent conversation messages
+        lock: Thread lock to protect access to the history deque
+        compressed: Whether the server sends framed, compressed broadcasts
         
     Note:
-        This function runs until the socket is closed or an error occurs.
+        This function runs until the socket is closed or an error occurs. A
+        frame that cannot be decoded ends the connection, since the stream
+        cannot be resynchronised after it.
     """
-    buffer = b""
+    buffer = bytearray()
+    frames = bytearray()
+    # Bind per-chunk lookups to locals once; this loop runs for every message.
+    wait_readable = select.select
+    recv = sock.recv
+    decode = bytes.decode
+    append = history.append
     while True:
         try:
             # Wait until the socket is readable or 1-s timeout to allow shutdown.
-            rdy, _, _ = select.select([sock], [], [], 1.0)
+            rdy, _, _ = wait_readable([sock], [], [], 1.0)
             if not rdy:
                 continue
-            chunk = sock.recv(RECV_CHUNK)
+            chunk = recv(RECV_CHUNK)
             if not chunk:
                 print("[Connection closed by server]")
                 break
-            buffer += chunk
-            while b"\n" in buffer:
-                line, buffer = buffer.split(b"\n", 1)
-                decoded = line.decode(errors="ignore").strip()
+            if compressed:
+                frames += chunk
+                payloads, consumed = decode_frames(frames, 0, len(frames))
+                del frames[:consumed]
+                for payload in payloads:
+                    buffer += payload
+            else:
+                buffer += chunk
+            lines, consumed = frame_lines(buffer, 0, len(buffer))
+            del buffer[:consumed]
+            for line in lines:
+                decoded = decode(line, errors="ignore").strip()
                 if decoded:
                     print(f"\n[Received] {decoded}")
                     with lock:
-                        history.append({"role": "user", "content": decoded})
-        except (OSError, ValueError):
+                        append({"role": "user", "content": decoded})
+        except (ValueError, zlib.error) as e:
+            print(f"\n[Cannot decode data from server: {e}; disconnecting]")
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            break
+        except OSError as e:
+            print(f"\n[Connection error: {e}]")
             break
 
 def parse_args() -> argparse.Namespace:
@@ -111,6 +145,8 @@ def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='AI Chat Client')
     parser.add_argument('--host', default=HOST, help='Server hostname or IP')
     parser.add_argument('--port', type=int, default=PORT, help='Server port')
+    parser.add_argument('--compressed', action='store_true',
+                        help='Expect framed, compressed broadcasts from the server')
     return parser.parse_args()
 
 def main() -> None:
@@ -141,11 +177,12 @@ def main() -> None:
     # Disable Nagle to reduce latency in small messages
     sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-    # Start receive thread
-    history: List[Dict[str, str]] = []
+    # Start receive thread. The deque keeps only the newest HISTORY_SIZE
+    # messages, so memory stays bounded and no slicing is needed.
+    history: Deque[Dict[str, str]] = deque(maxlen=HISTORY_SIZE)
     lock = threading.Lock()
     recv_thread = threading.Thread(
-        target=receive_loop, args=(sock, history, lock), daemon=True
+        target=receive_loop, args=(sock, history, lock, args.compressed), daemon=True
     )
     recv_thread.start()
     
@@ -155,8 +192,10 @@ def main() -> None:
         while True:
             # Short random delay mimics thinking and prevents flooding
             time.sleep(random.uniform(3, 7))
+            # Copy under the lock: iterating a deque while another thread
+            # appends to it raises RuntimeError.
             with lock:
-                context = history[-10:] if history else []
+                context = list(history)
             print(f"current context is: {context}")
             reply = get_ai_reply(context)
             print(f"\n[R2D2 says] {reply}")
@@ -166,6 +205,8 @@ def main() -> None:
                 history.append({"role": "assistant", "content": reply})
     except KeyboardInterrupt:
         print("\n[Client shutting down]")
+    except OSError as e:
+        print(f"\n[Connection lost: {e}]")
     finally:
         sock.close()
 
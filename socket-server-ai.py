@@ -20,47 +20,89 @@ Note:
     The server requires an OpenAI-compatible API endpoint to be configured.
 """
 
+import heapq
+import itertools
 import socket
 import threading
-import queue
 import time
 import random
-from typing import Dict, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
 
 from openai import OpenAI
 
+from core.direct_reply import ReplyCache, direct_reply
+from core.framing import encode_frame
+
 # Server configuration
 HOST = '0.0.0.0'  # Listen on all available network interfaces
 PORT = 65432      # Default port for the chat server
+MAX_BATCH = 64    # Maximum queued messages coalesced into one broadcast
+MAX_CONNECTIONS = 256  # Connection handler threads; further clients wait for a free one
+AI_WORKERS = 4         # Concurrent LLM requests
+COMPRESS_BROADCASTS = False  # Send framed, compressed broadcasts (clients need --compressed)
+COMPRESS_LZ4 = False  # Compress with lz4 instead of zlib (every client needs lz4 installed)
+RECV_CHUNK = 4096  # Maximum bytes to read per recv() call; each read is one message
 
-# Mapping of socket -> (addr, last_seen)
+# Mapping of socket -> addr
 # Global state
-clients: Dict[socket.socket, Tuple[str, float]] = {}
-"""Active client connections with their address and last activity timestamp.
+clients: Dict[socket.socket, Tuple[str, int]] = {}
+"""Active client connections with their address.
 
 Keys:
     socket.socket: The client socket object
 
 Values:
-    Tuple containing (address: str, last_seen: float)
+    The client's (IP address, port)
+"""
+
+heartbeats: List[Tuple[int, int, socket.socket]] = []
+"""Min-heap of (last_seen_ns, generation, conn) entries used by the reaper.
+
+Every message pushes a fresh entry; older entries for the same socket are left
+in place and skipped when popped because their generation no longer matches
+``generations[conn]`` (lazy deletion).
 """
 
+generations: Dict[socket.socket, int] = {}
+"""Generation of the most recent heartbeat entry for each connected socket."""
+
+_generation_counter = itertools.count()
+
 clients_lock = threading.Lock()
-"""Thread lock to synchronize access to the clients dictionary."""
+"""Thread lock to synchronize access to the clients, heartbeats and generations."""
 
-# Thread-safe queue used to fan-out messages to all connected clients
-message_queue: "queue.Queue[str]" = queue.Queue(maxsize=1000)
+# Queue used to fan-out messages to all connected clients
+message_queue: Deque[bytes] = deque(maxlen=1000)
 """Queue for broadcasting messages to all connected clients.
 
-Messages are added to this queue and processed by the dispatcher thread.
+Messages are added with ``post`` and processed by the dispatcher thread.
+``deque.append``/``popleft`` are atomic, so no lock is taken per message.
+If the dispatcher falls 1000 messages behind, the oldest are dropped.
 """
 
+have_messages = threading.Event()
+"""Set whenever ``message_queue`` may be non-empty; wakes the dispatcher."""
+
 # Initialize OpenAI client with local Ollama server
 client = OpenAI(base_url="http://10.209.1.96:11434/v1", api_key="ollama")
 
+reply_cache = ReplyCache()
+"""Exact-match cache of AI replies, consulted before calling the model."""
+
+conn_pool = ThreadPoolExecutor(max_workers=MAX_CONNECTIONS, thread_name_prefix="conn")
+"""Bounded pool running ``handle_client`` for each accepted connection."""
+
+ai_pool = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix="ai")
+"""Pool running ``get_ai_response`` so connection threads never block on the LLM."""
+
 def get_ai_response(user_msg: str) -> str:
     """Generate an AI response to the given user message.
     
+    Trivial input (greetings, very short or very long messages) and messages
+    that were answered before are handled without calling the model.
+    
     Args:
         user_msg: The user's message to respond to.
         
@@ -68,9 +110,12 @@ def get_ai_response(user_msg: str) -> str:
         str: The AI's generated response, or an error message if the request fails.
         
     Example:
-        >>> get_ai_response("Hello, how are you?")
-        "I'm doing well, thank you for asking! How can I assist you today?"
+        >>> get_ai_response("What's good to drink around here?")
+        "Depends how much you value your liver, friend."
     """
+    reply = direct_reply(user_msg) or reply_cache.get(user_msg)
+    if reply is not None:
+        return reply
     try:
         completion = client.chat.completions.create(
             model="llama3.2:3b",  # or any available local/remote model
@@ -81,15 +126,36 @@ def get_ai_response(user_msg: str) -> str:
                 {"role": "user", "content": user_msg}
             ]
         )
-        return completion.choices[0].message.content.strip()
+        reply = completion.choices[0].message.content.strip()
     except Exception as e:
         return f"[AI error]: {e}"
+    reply_cache.put(user_msg, reply)
+    return reply
+
+def post(message: bytes) -> None:
+    """Queue a message for broadcast and wake the dispatcher.
+
+    Args:
+        message: The UTF-8 encoded message to broadcast.
+    """
+    message_queue.append(message)
+    have_messages.set()
 
-def broadcast(message: str, sender_conn: Optional[socket.socket] = None) -> None:
+def heartbeat(conn: socket.socket) -> None:
+    """Record activity for a client. Must be called with ``clients_lock`` held.
+
+    Args:
+        conn: The client socket that was just active.
+    """
+    generation = next(_generation_counter)
+    generations[conn] = generation
+    heapq.heappush(heartbeats, (time.monotonic_ns(), generation, conn))
+
+def broadcast(message: bytes, sender_conn: Optional[socket.socket] = None) -> None:
     """Send a message to all connected clients.
     
     Args:
-        message: The message to broadcast.
+        message: The UTF-8 encoded message to broadcast.
         sender_conn: Optional client socket to exclude from the broadcast
                     (to avoid echoing back to the sender).
                     
@@ -98,11 +164,11 @@ def broadcast(message: str, sender_conn: Optional[socket.socket] = None) -> None
     """
     with clients_lock:
         dead = []
-        for conn, _ in clients.items():
+        for conn in clients:
             if sender_conn is not None and conn is sender_conn:
                 continue
             try:
-                conn.sendall(message.encode())
+                conn.sendall(message)
             except OSError:
                 dead.append(conn)
         # prune dead sockets outside loop to avoid mutation during iteration
@@ -111,13 +177,15 @@ def broadcast(message: str, sender_conn: Optional[socket.socket] = None) -> None
                 d.close()
             finally:
                 clients.pop(d, None)
+                generations.pop(d, None)
 
 def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
     """Handle communication with a single connected client.
     
-    This function runs in a separate thread for each client connection.
-    It reads incoming messages, broadcasts them to all clients, and optionally
-    generates AI responses.
+    This function runs on a ``conn_pool`` worker for each client connection.
+    It reads incoming messages, broadcasts them to all clients, and hands
+    each message to ``ai_pool`` so the AI reply is queued when it completes
+    while this thread goes back to reading.
     
     Args:
         conn: The client socket object.
@@ -126,14 +194,33 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
     Note:
         The client socket will be closed when this function returns.
     """
-    print(f"[+] Connected: {addr}")
+    # Render the address once as host:port (no tuple repr) and build the
+    # message prefixes from it; they never change for a connection.
+    addr_str = f"{addr[0]}:{addr[1]}"
+    addr_bytes = addr_str.encode()
+    prefix = b"[" + addr_bytes + b"] "
+    ai_prefix = "[C-K40 → ".encode() + addr_bytes + b"]: "
+    print(f"[+] Connected: {addr_str}")
     with clients_lock:
-        clients[conn] = (addr, time.time())
+        clients[conn] = addr
+        heartbeat(conn)
+
+    # Bind per-message lookups to locals once; this loop runs for every message.
+    recv = conn.recv
+    put = post
+
+    def queue_ai_reply(future: "Future[str]") -> None:
+        try:
+            ai_reply = future.result()
+            print(ai_reply)
+        except Exception as exc:
+            ai_reply = f"[AI error]: {exc}"
+        put(ai_prefix + ai_reply.encode() + b"\n")
 
     try:
         with conn:
             while True:
-                data = conn.recv(4096)
+                data = recv(RECV_CHUNK)
                 if not data:
                     break
                 user_msg = data.decode(errors="ignore").strip()
@@ -142,23 +229,18 @@ def handle_client(conn: socket.socket, addr: Tuple[str, int]) -> None:
                 print(user_msg)
                 # Update heartbeat
                 with clients_lock:
-                    clients[conn] = (addr, time.time())
+                    heartbeat(conn)
 
                 # Queue the user's public message first
-                message_queue.put_nowait(f"[{addr}] {user_msg}\n")
+                put(prefix + user_msg.encode() + b"\n")
 
                 # Generate and queue AI reply (non-blocking to user)
-                try:
-                    ai_reply = get_ai_response(user_msg)
-                    print(ai_reply)
-                except Exception as exc:
-                    ai_reply = f"[AI error]: {exc}"
-
-                message_queue.put_nowait(f"[C-K40 → {addr}]: {ai_reply}\n")
+                ai_pool.submit(get_ai_response, user_msg).add_done_callback(queue_ai_reply)
     finally:
-        print(f"[-] Disconnected: {addr}")
+        print(f"[-] Disconnected: {addr_str}")
         with clients_lock:
             clients.pop(conn, None)
+            generations.pop(conn, None)
         try:
             conn.close()
         except OSError:
@@ -169,34 +251,64 @@ def dispatcher_loop() -> None:
     
     This function runs in a dedicated thread and is responsible for taking
     messages from the message queue and broadcasting them to all connected
-    clients.
+    clients. Messages that pile up while a broadcast is in flight are
+    coalesced (up to ``MAX_BATCH``) so each client receives the whole batch
+    in a single ``sendall`` instead of one syscall per message.
+
+    With ``COMPRESS_BROADCASTS`` enabled each batch is wrapped in a
+    (compressed) frame once, and the same frame is sent to every client.
     """
+    popleft = message_queue.popleft
     while True:
-        msg = message_queue.get()
-        broadcast(msg)
+        have_messages.wait()
+        # Clear before draining: a message posted after this point sets the
+        # event again, so it is never left waiting for the next wakeup.
+        have_messages.clear()
+        while message_queue:
+            batch = []
+            try:
+                while len(batch) < MAX_BATCH:
+                    batch.append(popleft())
+            except IndexError:
+                pass
+            payload = b"".join(batch)
+            if COMPRESS_BROADCASTS:
+                payload = encode_frame(payload, use_lz4=COMPRESS_LZ4)
+            broadcast(payload)
 
 def reaper_loop(timeout: int = 10) -> None:
     """Periodically clean up inactive client connections.
     
     This function runs in a dedicated thread and removes clients that haven't
-    sent any data within the specified timeout period.
+    sent any data within the specified timeout period. Only heartbeats that
+    have expired are popped from the heap, so each pass costs O(k log N) for
+    k expired entries instead of a scan over every client, and the thread
+    sleeps until the oldest live heartbeat is due.
     
     Args:
         timeout: Number of seconds of inactivity before a client is disconnected.
     """
+    timeout_ns = timeout * 1_000_000_000
+    monotonic_ns = time.monotonic_ns
+    heappop = heapq.heappop
     while True:
-        time.sleep(timeout)
-        now = time.time()
+        stale = []
         with clients_lock:
-            stale = [conn for conn, (_, last) in clients.items() if now - last > timeout]
+            now = monotonic_ns()
+            while heartbeats and heartbeats[0][0] + timeout_ns <= now:
+                _, generation, conn = heappop(heartbeats)
+                if generations.get(conn) == generation:
+                    stale.append(conn)
+                    clients.pop(conn, None)
+                    generations.pop(conn, None)
+            wait_ns = heartbeats[0][0] + timeout_ns - now if heartbeats else timeout_ns
         for conn in stale:
             try:
                 conn.shutdown(socket.SHUT_RDWR)
                 conn.close()
             except OSError:
                 pass
-            with clients_lock:
-                clients.pop(conn, None)
+        time.sleep(wait_ns / 1_000_000_000)
 
 def start_server() -> None:
     """Start the chat server and initialize worker threads.
@@ -224,9 +336,19 @@ def start_server() -> None:
                 # Ctrl-C pressed – break the accept loop so the program can exit.
                 print("\n[!] Ctrl-C detected, shutting down server …")
                 break
-            threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
+            conn_pool.submit(handle_client, conn, addr)
     finally:
         server_sock.close()
+        # Pool workers are not daemon threads, so unblock their recv() calls
+        # before the interpreter waits for them at exit.
+        with clients_lock:
+            for conn in clients:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        conn_pool.shutdown(wait=False, cancel_futures=True)
+        ai_pool.shutdown(wait=False, cancel_futures=True)
         print("[*] Server socket closed. Bye!")
 
 if __name__ == "__main__":
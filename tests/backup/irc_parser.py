@@ -0,0 +1,69 @@
+"""IRC line tokenizer used by the mock IRC server.
+
+``parse_line`` splits one raw line (without its CRLF) into the upper-cased
+command and its parameters, following RFC 1459: an optional ``:prefix`` is
+skipped, middle parameters are separated by runs of spaces and a parameter
+starting with ``:`` takes the rest of the line, spaces included.
+
+The code sticks to the statically typed subset of Python that *mypyc*
+understands, so the module can be compiled to a C extension
+(``mypyc tests/backup/irc_parser.py``) wherever that toolchain is installed;
+the compiled module is then picked up by the same import. Uncompiled, the
+scanning still runs in C: ``bytes.find`` is backed by ``memchr``.
+
+Example:
+>>> from irc_parser import parse_line
+>>> parse_line(b"privmsg #room :hello there")
+(b'PRIVMSG', [b'#room', b'hello there'])
+"""
+from __future__ import annotations
+
+from typing import List, Tuple
+
+_SPACE = 0x20
+_COLON = 0x3a
+
+
+def parse_line(data: bytes) -> Tuple[bytes, List[bytes]]:
+    """Split an IRC line into its command and parameters.
+
+    Args:
+        data: One line as received from the client, without the trailing CRLF
+
+    Returns:
+        tuple: ``(command, params)``. *command* is upper-cased and is ``b""``
+        for a blank line.
+    """
+    end = len(data)
+    pos = 0
+    while pos < end and data[pos] == _SPACE:
+        pos += 1
+    # Skip the optional ":prefix" sent by some clients
+    if pos < end and data[pos] == _COLON:
+        pos = data.find(b" ", pos)
+        if pos < 0:
+            return b"", []
+        while pos < end and data[pos] == _SPACE:
+            pos += 1
+
+    stop = data.find(b" ", pos)
+    if stop < 0:
+        stop = end
+    command = data[pos:stop].upper()
+
+    params: List[bytes] = []
+    pos = stop
+    while pos < end:
+        while pos < end and data[pos] == _SPACE:
+            pos += 1
+        if pos >= end:
+            break
+        if data[pos] == _COLON:
+            params.append(data[pos + 1:end])
+            break
+        stop = data.find(b" ", pos)
+        if stop < 0:
+            stop = end
+        params.append(data[pos:stop])
+        pos = stop
+    return command, params
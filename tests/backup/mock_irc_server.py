@@ -1,286 +1,422 @@
 """Mock IRC server for testing IRC client functionality."""
 import asyncio
+import datetime
 import logging
+import os
 import socket
 import threading
-from typing import Dict, List, Set, Optional
+from typing import Dict, Iterator, List, Set, Optional
+
+from irc_parser import parse_line
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional; fall back to the stdlib event loop
+    uvloop = None
 
 logger = logging.getLogger(__name__)
 
+# Constant parts of server replies, encoded once. A reply is assembled as
+# _SRV + numeric + nick + suffix (+ any variable parts in between).
+_SRV = b":test.irc.server "
+_CREATED = datetime.datetime.now().strftime('%a %b %d %Y').encode()
+_RPL_WELCOME = b" :Welcome to the Internet Relay Network "
+_WELCOME_TAIL = (
+    (b"002 ", b" :Your host is test.irc.server, running version mock-1.0\r\n"),
+    (b"003 ", b" :This server was created " + _CREATED + b"\r\n"),
+    (b"004 ", b" test.irc.server mock-1.0 i o itkl mnpstrxcfhvz bklovq\r\n"),
+    (b"375 ", b" :- test.irc.server Message of the Day -\r\n"),
+    (b"372 ", b" :- Welcome to the test IRC server\r\n"),
+    (b"376 ", b" :End of /MOTD command\r\n"),
+)
+_RPL_NOTOPIC = b" :No topic is set\r\n"
+_RPL_ENDOFNAMES = b" :End of /NAMES list\r\n"
+_ERR_NORECIPIENT = b" :No recipient given (PRIVMSG)\r\n"
+_ERR_NONICKNAMEGIVEN = b" :No nickname given\r\n"
+_ERR_NOTREGISTERED = b" :You have not registered\r\n"
+_ERR_NEEDMOREPARAMS = {
+    cmd: b" %s :Not enough parameters\r\n" % cmd for cmd in (b"USER", b"JOIN", b"PART")
+}
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """Create a uvloop event loop when uvloop is installed, else a stdlib one."""
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def _iter_split(data: bytes, sep: int) -> Iterator[bytes]:
+    """Yield the fields of *data* separated by the byte value *sep*, without building a list."""
+    start = 0
+    while True:
+        end = data.find(sep, start)
+        if end < 0:
+            yield data[start:]
+            return
+        yield data[start:end]
+        start = end + 1
+
+
+class ClientState:
+    """Per-connection state of a mock server client."""
+    
+    __slots__ = ('nick', 'user', 'registered', 'hostname', 'id', 'realname', 'prefix', 'channels',
+                 'write', 'drain')
+    
+    def __init__(self, hostname: str, client_id: str, writer: asyncio.StreamWriter):
+        self.nick = 'unknown'
+        self.user: Optional[str] = None
+        self.registered = False
+        self.hostname = hostname
+        self.id = client_id
+        self.realname: Optional[str] = None
+        # Encoded ":nick!user@host " message prefix, set on registration
+        # and refreshed on NICK
+        self.prefix: Optional[bytes] = None
+        # Names of the channels this client has joined
+        self.channels: Set[str] = set()
+        # The writer's bound methods, so the hot reply paths can write and
+        # drain without going through send_raw
+        self.write = writer.write
+        self.drain = writer.drain
+
+
 class MockIRCServer:
     """A simple mock IRC server for testing."""
     
-    def __init__(self, host: str = '127.0.0.1', port: int = 16667):  # Changed from 6667 to avoid conflicts with real IRC servers
+    IDLE_TIMEOUT = 30.0  # Seconds without any data before a client is dropped
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 16667,  # Changed from 6667 to avoid conflicts with real IRC servers
+                 unix_path: Optional[str] = None):
         self.host = host
         self.port = port
+        # When set, listen on this Unix-domain socket instead of host/port
+        self.unix_path = unix_path
+        self._pong_host = f"PONG :{host}\r\n".encode()
         self.server: Optional[asyncio.Server] = None
-        # Store client state: {writer: {'nick': str, 'user': str, 'registered': bool, 'hostname': str}}
-        self.clients: Dict[asyncio.StreamWriter, dict] = {}
+        self.clients: Dict[asyncio.StreamWriter, ClientState] = {}
+        # Channel name -> writers of the channel's members
         self.channels: Dict[str, Set[asyncio.StreamWriter]] = {}
-        self._stop_event = threading.Event()
-        self._loop: Optional[asyncio.AbstractEventLoop] = None
-        self._thread: Optional[threading.Thread] = None
-        self._write_lock = asyncio.Lock()  # Lock for thread-safe writes
+        self._server_task: Optional[asyncio.Task] = None
+        # Command keyword -> handler, looked up with the raw bytes keyword
+        self._handlers = {
+            b'NICK': self._h_nick,
+            b'USER': self._h_user,
+            b'JOIN': self._h_join,
+            b'PING': self._h_ping,
+            b'PRIVMSG': self._h_privmsg,
+            b'QUIT': self._h_quit,
+            b'PART': self._h_part,
+        }
     
     async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
         """Handle a new client connection."""
         client_addr = writer.get_extra_info('peername')
         client_id = f"client-{id(writer)}"
         
-        # Initialize client state
-        self.clients[writer] = {
-            'nick': 'unknown',
-            'user': None,
-            'registered': False,
-            'hostname': client_addr[0],
-            'id': client_id
-        }
+        # IRC lines are small; don't let Nagle hold them back waiting for ACKs
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        
+        # Initialize client state; Unix-socket peers have no address
+        hostname = client_addr[0] if client_addr else 'localhost'
+        self.clients[writer] = ClientState(hostname, client_id, writer)
         
-        logger.info(f"New connection from {client_addr} (ID: {client_id})")
+        logger.info("New connection from %s (ID: %s)", client_addr, client_id)
         
+        # Idle watchdog: a single timer per connection that cancels this task
+        # once nothing has been read for IDLE_TIMEOUT seconds. Reads only
+        # record when they happened; the timer re-arms itself for the time
+        # remaining, so no timer or task is created per read.
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        last_rx = loop.time()
+        timed_out = False
+        
+        def check_idle() -> None:
+            nonlocal idle_handle, timed_out
+            idle = loop.time() - last_rx
+            if idle >= self.IDLE_TIMEOUT:
+                timed_out = True
+                task.cancel()
+            else:
+                idle_handle = loop.call_later(self.IDLE_TIMEOUT - idle, check_idle)
+        
+        idle_handle = loop.call_later(self.IDLE_TIMEOUT, check_idle)
+        
+        buf = bytearray()
         try:
             # Main client loop
-            while not self._stop_event.is_set() and not writer.is_closing():
+            while not writer.is_closing():
                 try:
-                    # Read a line from the client with a timeout
-                    data = await asyncio.wait_for(reader.readline(), timeout=30.0)
+                    # Read whatever has arrived (possibly many lines)
+                    data = await reader.read(4096)
+                    last_rx = loop.time()
                     if not data:
-                        logger.info(f"Client {client_id} disconnected")
+                        logger.info("Client %s disconnected", client_id)
                         break
-                        
-                    line = data.decode(errors='ignore').strip()
-                    if not line:
-                        continue
-                        
-                    logger.debug(f"Received from {client_id}: {line}")
+                    buf += data
                     
-                    # Process the command
-                    await self.process_command(line, writer, client_id)
+                    # Process every complete line; keep a partial one for the next read
+                    start = 0
+                    while True:
+                        end = buf.find(b'\n', start)
+                        if end < 0:
+                            break
+                        line = bytes(buf[start:end]).strip()
+                        start = end + 1
+                        if not line:
+                            continue
+                            
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Received from %s: %r", client_id, line)
+                        
+                        # Process the command
+                        await self.process_command(line, writer, client_id)
+                    del buf[:start]
                     
-                except asyncio.TimeoutError:
-                    logger.info(f"Connection timeout for client {client_id}")
+                except asyncio.CancelledError:
+                    if not timed_out:
+                        raise
+                    # Withdraw the watchdog's cancel request (Python 3.11+) so
+                    # cleanup is not treated as cancelled; if someone else
+                    # cancelled the task too, let that propagate
+                    if hasattr(task, 'uncancel') and task.uncancel():
+                        raise
+                    logger.info("Connection timeout for client %s", client_id)
                     break
                 except ConnectionResetError:
-                    logger.info(f"Connection reset by client {client_id}")
+                    logger.info("Connection reset by client %s", client_id)
                     break
                 except Exception as e:
-                    logger.error(f"Error handling client {client_id}: {e}")
+                    logger.error("Error handling client %s: %s", client_id, e)
                     break
                     
         except Exception as e:
-            logger.error(f"Unexpected error with client {client_id}: {e}")
+            logger.error("Unexpected error with client %s: %s", client_id, e)
         finally:
+            idle_handle.cancel()
             await self.cleanup_client(writer)
     
     async def _send_welcome_messages(self, writer: asyncio.StreamWriter) -> None:
         """Send welcome messages to a newly registered client."""
-        if writer not in self.clients:
-            return
-            
-        client = self.clients[writer]
-        if not client['registered']:
+        client = self.clients.get(writer)
+        if client is None or not client.registered:
             return
             
-        nick = client['nick']
+        nick = client.nick.encode()
         
         # Send welcome messages
-        welcome_messages = [
-            f":test.irc.server 001 {nick} :Welcome to the Internet Relay Network {nick}",
-            f":test.irc.server 002 {nick} :Your host is test.irc.server, running version mock-1.0",
-            f":test.irc.server 003 {nick} :This server was created {datetime.datetime.now().strftime('%a %b %d %Y')}",
-            f":test.irc.server 004 {nick} test.irc.server mock-1.0 i o itkl mnpstrxcfhvz bklovq",
-            f":test.irc.server 375 {nick} :- test.irc.server Message of the Day -",
-            f":test.irc.server 372 {nick} :- Welcome to the test IRC server",
-            f":test.irc.server 376 {nick} :End of /MOTD command"
-        ]
+        welcome_messages = [_SRV + b"001 " + nick + _RPL_WELCOME + nick + b"\r\n"]
+        welcome_messages.extend(_SRV + numeric + nick + suffix for numeric, suffix in _WELCOME_TAIL)
         
-        for msg in welcome_messages:
-            await self.send_response(writer, msg)
+        await self.send_responses(writer, welcome_messages)
     
-    async def process_command(self, line: str, writer: asyncio.StreamWriter, client_id: str) -> None:
-        """Process an IRC command."""
-        if not line.strip() or writer.is_closing():
+    async def process_command(self, line: bytes, writer: asyncio.StreamWriter, client_id: str) -> None:
+        """Process a raw IRC command line (without the trailing CRLF)."""
+        if writer.is_closing():
             return
             
-        parts = line.split()
-        if not parts:
+        # Parameters stay bytes; handlers decode them only if they need text
+        cmd, params = parse_line(line)
+        if not cmd:
             return
-            
-        cmd = parts[0].upper()
-        params = parts[1:]
         
         # Get client state
         client = self.clients.get(writer)
-        if not client:
-            logger.warning(f"Received command from unknown client: {cmd}")
+        if client is None:
+            logger.warning("Received command from unknown client: %r", cmd)
             return
             
-        current_nick = client['nick']
-        logger.debug(f"Processing command from {client_id} (nick: {current_nick}): {cmd} {params}")
-        
+        handler = self._handlers.get(cmd)
+        if handler is None:
+            logger.debug("Unhandled command: %r %s", cmd, params)
+            return
+            
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processing command from %s (nick: %s): %r %s", client_id, client.nick, cmd, params)
         try:
-            if cmd == "NICK":
-                if not params:
-                    await self.send_response(writer, f":test.irc.server 431 {current_nick} :No nickname given")
-                    return
-                    
-                new_nick = params[0]
-                old_nick = client['nick']
-                
-                # Update client state
-                client['nick'] = new_nick
-                logger.info(f"Client {client_id} changed nick from {old_nick} to {new_nick}")
-                
-                # If client was already registered, send NICK change notification
-                if client['registered']:
-                    await self.send_response(writer, f":{old_nick} NICK {new_nick}")
-                # Otherwise, check if we can complete registration
-                elif client['user'] is not None:
-                    await self._complete_registration(writer)
-                
-            elif cmd == "USER":
-                if len(params) < 4:
-                    await self.send_response(writer, f":test.irc.server 461 {current_nick} USER :Not enough parameters")
-                    return
-                    
-                username, hostname, servername, realname = params[0:4]
-                logger.info(f"Client {client_id} identified as {username}@{hostname} : {realname}")
-                
-                # Update client state
-                client.update({
-                    'user': username,
-                    'hostname': hostname,
-                    'realname': realname
-                })
-                
-                # If we already have a nick, complete registration
-                if client['nick'] != 'unknown':
-                    await self._complete_registration(writer)
-                
-            elif cmd == "JOIN":
-                if not client['registered']:
-                    await self.send_response(writer, f":test.irc.server 451 {current_nick} :You have not registered")
-                    return
-                    
-                if not params:
-                    await self.send_response(writer, f":test.irc.server 461 {current_nick} JOIN :Not enough parameters")
-                    return
-                    
-                channel = params[0].lower()
-                if not channel.startswith('#'):
-                    channel = '#' + channel
-                    
-                # Create channel if it doesn't exist
-                if channel not in self.channels:
-                    self.channels[channel] = set()
-                    
-                # Add client to channel
-                self.channels[channel].add(writer)
-                logger.info(f"Client {client_id} ({current_nick}) joined {channel}")
-                
-                # Send join notification to the client
-                await self.send_response(writer, f":{current_nick}!{client['user']}@{client['hostname']} JOIN {channel}")
-                
-                # Send channel topic (empty for now)
-                await self.send_response(writer, f":test.irc.server 332 {current_nick} {channel} :No topic is set")
-                
-                # Send names list (just the joining user for now)
-                await self.send_response(writer, f":test.irc.server 353 {current_nick} = {channel} :{current_nick}")
-                await self.send_response(writer, f":test.irc.server 366 {current_nick} {channel} :End of /NAMES list")
-                    
-            elif cmd == "PING":
-                # Respond to PING with PONG
-                if params:
-                    await self.send_response(writer, f"PONG {params[0]}")
-                else:
-                    await self.send_response(writer, f"PONG :{self.host}")
-                    
-            elif cmd == "PRIVMSG":
-                if not client['registered']:
-                    await self.send_response(writer, f":test.irc.server 451 {current_nick} :You have not registered")
-                    return
-                    
-                if len(params) < 2:
-                    await self.send_response(writer, f":test.irc.server 411 {current_nick} :No recipient given (PRIVMSG)")
-                    return
-                    
-                targets = params[0].split(',')
-                message = ' '.join(params[1:]).lstrip(':')
-                
-                for target in targets:
-                    logger.info(f"Message from {current_nick} to {target}: {message}")
-                    
-                    if target.startswith('#'):
-                        # Channel message
-                        if target in self.channels:
-                            for client_writer in self.channels[target]:
-                                if client_writer != writer:  # Don't echo back to sender
-                                    await self.send_response(
-                                        client_writer, 
-                                        f":{current_nick}!{client['user']}@{client['hostname']} PRIVMSG {target} :{message}"
-                                    )
-                    else:
-                        # Private message (in mock server, just echo back to sender)
-                        await self.send_response(
-                            writer,
-                            f":{current_nick}!{client['user']}@{client['hostname']} PRIVMSG {target} :{message}"
-                        )
-                        
-            elif cmd == "QUIT":
-                reason = params[0] if params else "Client quit"
-                logger.info(f"Client {client_id} ({current_nick}) quit: {reason}")
-                await self.cleanup_client(writer)
-                
-            elif cmd == "PART":
-                if not params:
-                    await self.send_response(writer, f":test.irc.server 461 {current_nick} PART :Not enough parameters")
-                    return
-                    
-                channels = params[0].split(',')
-                for channel in channels:
-                    if channel in self.channels and writer in self.channels[channel]:
-                        self.channels[channel].remove(writer)
-                        await self.send_response(writer, f":{current_nick}!{client['user']}@{client['hostname']} PART {channel}")
-                        
-            else:
-                logger.debug(f"Unhandled command: {cmd} {params}")
-                
+            await handler(writer, params, client)
         except Exception as e:
-            logger.error(f"Error processing command '{cmd} {params}' from {client_id}: {e}")
+            logger.error("Error processing command '%r %s' from %s: %s", cmd, params, client_id, e)
+    
+    async def _h_nick(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle NICK: set or change the client's nickname."""
+        if not params:
+            await self.send_numeric(writer, b"431 ", client.nick, _ERR_NONICKNAMEGIVEN)
+            return
+            
+        new_nick = params[0].decode(errors='ignore')
+        old_nick = client.nick
+        
+        # Update client state
+        client.nick = new_nick
+        logger.info("Client %s changed nick from %s to %s", client.id, old_nick, new_nick)
+        
+        # If client was already registered, send NICK change notification
+        if client.registered:
+            self._set_prefix(client)
+            await self.send_response(writer, f":{old_nick} NICK {new_nick}")
+        # Otherwise, check if we can complete registration
+        elif client.user is not None:
+            await self._complete_registration(writer)
+    
+    async def _h_user(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle USER: record the client's user details."""
+        if len(params) < 4:
+            await self.send_numeric(writer, b"461 ", client.nick, _ERR_NEEDMOREPARAMS[b"USER"])
+            return
+            
+        username, hostname, servername, realname = (p.decode(errors='ignore') for p in params[0:4])
+        logger.info("Client %s identified as %s@%s : %s", client.id, username, hostname, realname)
+        
+        # Update client state
+        client.user = username
+        client.hostname = hostname
+        client.realname = realname
+        
+        # If we already have a nick, complete registration
+        if client.nick != 'unknown':
+            await self._complete_registration(writer)
+    
+    async def _h_join(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle JOIN: add the client to a channel."""
+        current_nick = client.nick
+        if not client.registered:
+            await self.send_numeric(writer, b"451 ", current_nick, _ERR_NOTREGISTERED)
+            return
+            
+        if not params:
+            await self.send_numeric(writer, b"461 ", current_nick, _ERR_NEEDMOREPARAMS[b"JOIN"])
+            return
+            
+        channel = params[0].decode(errors='ignore').lower()
+        if not channel.startswith('#'):
+            channel = '#' + channel
+            
+        # Add client to channel, creating it if it doesn't exist
+        self.channels.setdefault(channel, set()).add(writer)
+        client.channels.add(channel)
+        logger.info("Client %s (%s) joined %s", client.id, current_nick, channel)
+        
+        # Send join notification, channel topic (empty for now) and
+        # names list (just the joining user for now) in one batch
+        nick = current_nick.encode()
+        channel_b = channel.encode()
+        await self.send_responses(writer, [
+            client.prefix + b"JOIN " + channel_b + b"\r\n",
+            _SRV + b"332 " + nick + b" " + channel_b + _RPL_NOTOPIC,
+            _SRV + b"353 " + nick + b" = " + channel_b + b" :" + nick + b"\r\n",
+            _SRV + b"366 " + nick + b" " + channel_b + _RPL_ENDOFNAMES,
+        ])
+    
+    async def _h_ping(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle PING: respond with PONG."""
+        if params:
+            client.write(b"PONG :" + params[0] + b"\r\n")
+        else:
+            client.write(self._pong_host)
+        await client.drain()
+    
+    async def _h_privmsg(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle PRIVMSG: relay a message to channels or echo it back."""
+        current_nick = client.nick
+        if not client.registered:
+            await self.send_numeric(writer, b"451 ", current_nick, _ERR_NOTREGISTERED)
+            return
+            
+        if len(params) < 2:
+            await self.send_numeric(writer, b"411 ", current_nick, _ERR_NORECIPIENT)
+            return
+            
+        # Clients that omit the ':' before a multi-word message still get it
+        # relayed whole
+        message = b' '.join(params[1:])
+        
+        for target in _iter_split(params[0], 0x2c):  # ','
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Message from %s to %s: %s", current_nick,
+                            target.decode(errors='ignore'), message.decode(errors='ignore'))
+            payload = client.prefix + b"PRIVMSG " + target + b" :" + message + b"\r\n"
+            
+            if target.startswith(b'#'):
+                # Channel message: send to every other member concurrently
+                # (don't echo back to sender)
+                members = self.channels.get(target.decode(errors='ignore'))
+                if members:
+                    # Queue the frame on every transport first, then wait for
+                    # all of them to drain together
+                    recipients = [w for w in members if w is not writer and not w.is_closing()]
+                    for w in recipients:
+                        w.write(payload)
+                    await asyncio.gather(*[w.drain() for w in recipients], return_exceptions=True)
+            else:
+                # Private message (in mock server, just echo back to sender)
+                client.write(payload)
+                await client.drain()
+    
+    async def _h_quit(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle QUIT: disconnect the client."""
+        reason = params[0].decode(errors='ignore') if params else "Client quit"
+        logger.info("Client %s (%s) quit: %s", client.id, client.nick, reason)
+        await self.cleanup_client(writer)
+    
+    async def _h_part(self, writer: asyncio.StreamWriter, params: List[bytes], client: ClientState) -> None:
+        """Handle PART: remove the client from one or more channels."""
+        current_nick = client.nick
+        if not params:
+            await self.send_numeric(writer, b"461 ", current_nick, _ERR_NEEDMOREPARAMS[b"PART"])
+            return
+            
+        for channel_b in _iter_split(params[0], 0x2c):  # ','
+            channel = channel_b.decode(errors='ignore')
+            members = self.channels.get(channel)
+            if members and writer in members:
+                members.discard(writer)
+                client.channels.discard(channel)
+                if not members:  # If channel is empty, remove it
+                    del self.channels[channel]
+                client.write(client.prefix + b"PART " + channel_b + b"\r\n")
+                await client.drain()
     
     async def cleanup_client(self, writer: asyncio.StreamWriter) -> None:
         """Clean up a client connection."""
-        if writer not in self.clients:
+        client = self.clients.get(writer)
+        if client is None:
             return
             
-        client = self.clients[writer]
-        client_id = client['id']
-        nick = client['nick']
+        client_id = client.id
+        nick = client.nick
         
-        logger.info(f"Cleaning up client {client_id} ({nick})")
+        logger.info("Cleaning up client %s (%s)", client_id, nick)
         
-        # Notify channels that user is leaving
-        for channel, clients in list(self.channels.items()):
-            if writer in clients:
-                # Send PART message to other clients in the channel
-                for other_writer in list(clients):
-                    if other_writer != writer and not other_writer.is_closing():
-                        try:
-                            await self.send_response(
-                                other_writer,
-                                f":{nick}!{client['user']}@{client['hostname']} PART {channel} :Client disconnected"
-                            )
-                        except Exception as e:
-                            logger.debug(f"Error notifying channel {channel} about PART: {e}")
+        # Notify the channels the user is in that they are leaving
+        for channel in list(client.channels):
+            client.channels.discard(channel)
+            clients = self.channels.get(channel)
+            if clients is None or writer not in clients:
+                continue
                 
-                # Remove from channel
-                clients.discard(writer)
-                if not clients:  # If channel is empty, remove it
-                    del self.channels[channel]
+            # Send PART message to other clients in the channel concurrently
+            payload = client.prefix + b"PART " + channel.encode() + b" :Client disconnected\r\n"
+            results = await asyncio.gather(
+                *[self.send_raw(w, payload) for w in list(clients)
+                  if w is not writer and not w.is_closing()],
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.debug("Error notifying channel %s about PART: %s", channel, result)
+            
+            # Remove from channel
+            clients.discard(writer)
+            if not clients:  # If channel is empty, remove it
+                self.channels.pop(channel, None)
         
         # Remove from clients dict
-        if writer in self.clients:
-            del self.clients[writer]
+        self.clients.pop(writer, None)
         
         # Close the writer
         if not writer.is_closing():
@@ -288,213 +424,207 @@ class MockIRCServer:
                 writer.close()
                 await asyncio.wait_for(writer.wait_closed(), timeout=1.0)
             except (asyncio.TimeoutError, Exception) as e:
-                logger.debug(f"Error closing writer: {e}")
+                logger.debug("Error closing writer: %s", e)
                 try:
                     if hasattr(writer, 'transport') and writer.transport:
                         writer.transport.abort()
                 except Exception as e:
-                    logger.debug(f"Error aborting transport: {e}")
+                    logger.debug("Error aborting transport: %s", e)
             finally:
                 # Ensure we don't try to use this writer again
-                if writer in self.clients:
-                    del self.clients[writer]
+                self.clients.pop(writer, None)
     
     async def _complete_registration(self, writer: asyncio.StreamWriter) -> None:
         """Complete client registration after both NICK and USER have been received."""
-        if writer not in self.clients or self.clients[writer]['registered']:
+        client = self.clients.get(writer)
+        if client is None or client.registered:
             return
             
-        client = self.clients[writer]
-        if client['nick'] == 'unknown' or client['user'] is None:
+        if client.nick == 'unknown' or client.user is None:
             return
             
         # Mark client as registered
-        client['registered'] = True
-        logger.info(f"Client {client['id']} registered as {client['nick']}")
+        client.registered = True
+        self._set_prefix(client)
+        logger.info("Client %s registered as %s", client.id, client.nick)
         
         # Send welcome messages
         await self._send_welcome_messages(writer)
     
+    @staticmethod
+    def _set_prefix(client: ClientState) -> None:
+        """Cache the client's encoded ":nick!user@host " message prefix."""
+        client.prefix = f":{client.nick}!{client.user}@{client.hostname} ".encode()
+    
     async def send_response(self, writer: asyncio.StreamWriter, response: str) -> None:
         """Send a response to a client."""
+        await self.send_raw(writer, f"{response}\r\n".encode())
+    
+    async def send_responses(self, writer: asyncio.StreamWriter, responses: List[bytes]) -> None:
+        """Send several encoded, CRLF-terminated responses with one writelines() call and a single drain."""
         if writer.is_closing():
             return
             
+        # The transport takes the list as is, so the lines are never joined
+        # into one intermediate buffer here
+        writer.writelines(responses)
+        await self._drain(writer)
+    
+    async def send_numeric(self, writer: asyncio.StreamWriter, numeric: bytes, nick: str, suffix: bytes) -> None:
+        """Send a server numeric reply built from pre-encoded constant parts."""
+        await self.send_raw(writer, _SRV + numeric + nick.encode() + suffix)
+    
+    async def send_raw(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        """Send already encoded, CRLF-terminated data to a client and wait for it to drain."""
+        if writer.is_closing():
+            return
+            
+        # No lock: write() appends to this writer's own transport buffer in
+        # one step, and drain() only waits on this writer's flow control,
+        # so one slow client never holds up sends to the others.
+        writer.write(data)
+        await self._drain(writer)
+    
+    async def _drain(self, writer: asyncio.StreamWriter) -> None:
+        """Wait for a client's send buffer to drain, cleaning up if the connection was lost."""
         try:
-            # Use a lock to prevent concurrent writes to the same writer
-            async with self._write_lock:
-                writer.write(f"{response}\r\n".encode())
-                await writer.drain()
+            await writer.drain()
         except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
-            logger.debug(f"Connection lost while sending response to client")
+            logger.debug("Connection lost while sending response to client")
             await self.cleanup_client(writer)
         except Exception as e:
-            logger.error(f"Error sending response to client: {e}")
+            logger.error("Error sending response to client: %s", e)
     
     async def start_async(self) -> None:
         """Start the mock server asynchronously."""
-        self.server = await asyncio.start_server(
-            self.handle_client,  # Fixed: Use the correct method name
-            host=self.host,
-            port=self.port,
-            reuse_address=True
-        )
+        if self.unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=self.unix_path)
+        else:
+            self.server = await asyncio.start_server(
+                self.handle_client,  # Fixed: Use the correct method name
+                host=self.host,
+                port=self.port,
+                reuse_address=True,
+                reuse_port=hasattr(socket, 'SO_REUSEPORT')
+            )
         self._server_task = asyncio.create_task(self._run_server())
-        logger.info(f"Mock IRC server running on {self.host}:{self.port}")
+        logger.info("Mock IRC server running on %s", self.unix_path or f"{self.host}:{self.port}")
         
     async def _run_server(self) -> None:
         """Run the server until it's stopped."""
         try:
-            async with self.server:
-                await self.server.serve_forever()
+            await self.server.serve_forever()
         except asyncio.CancelledError:
             logger.info("Server task cancelled")
         except Exception as e:
-            logger.error(f"Server error: {e}")
-        finally:
-            await self.stop_async()
+            logger.error("Server error: %s", e)
             
     async def stop_async(self) -> None:
         """Stop the server and clean up resources."""
-        if hasattr(self, '_server_task') and not self._server_task.done():
+        logger.info("Stopping mock IRC server...")
+        if self._server_task is not None:
             self._server_task.cancel()
-            try:
-                await self._server_task
-            except asyncio.CancelledError:
-                pass
+            await asyncio.gather(self._server_task, return_exceptions=True)
+            self._server_task = None
                 
-        if hasattr(self, 'server') and self.server:
+        if self.server is not None:
             self.server.close()
-            await self.server.wait_closed()
             
-        # Clean up all client connections
-        for writer in list(self.clients.keys()):
-            await self.cleanup_client(writer)
-        
-        async with self.server:
-            await self.server.serve_forever()
-    
-    def start(self) -> None:
-        """Start the mock server in a background thread."""
-        self._loop = asyncio.new_event_loop()
-        self._thread = threading.Thread(
-            target=self._run_server,
-            daemon=True
-        )
-        self._thread.start()
-    
-    def _run_server(self) -> None:
-        """Run the server in the background thread."""
-        asyncio.set_event_loop(self._loop)
-        self._loop.run_until_complete(self.start_async())
-    
-    def stop(self) -> None:
-        """Stop the mock server and clean up all resources."""
-        logger.info("Stopping mock IRC server...")
-        self._stop_event.set()
-        
-        # Close all client connections
-        for writer in list(self.clients.keys()):
-            try:
-                writer.close()
-                if self._loop and not self._loop.is_closed():
-                    self._loop.call_soon_threadsafe(writer.close)
-            except Exception as e:
-                logger.debug(f"Error closing client writer: {e}")
-        
-        # Close the server
-        if self.server:
-            try:
-                if self._loop and not self._loop.is_closed():
-                    self._loop.call_soon_threadsafe(self.server.close)
-                    # Schedule the event loop to stop after a short delay
-                    self._loop.call_later(0.1, self._loop.stop)
-            except Exception as e:
-                logger.debug(f"Error closing server: {e}")
-        
-        # Clean up the event loop
-        if self._loop and not self._loop.is_closed():
+        # Close all client connections. Everyone is going away, so skip the
+        # per-channel PART notices cleanup_client would send.
+        while self.clients:
+            writer, _ = self.clients.popitem()
+            writer.close()
             try:
-                # Cancel all tasks
-                pending = asyncio.all_tasks(loop=self._loop)
-                for task in pending:
-                    task.cancel()
-                # Give tasks a chance to clean up
-                if pending:
-                    self._loop.run_until_complete(
-                        asyncio.wait(pending, timeout=1.0, return_when=asyncio.ALL_COMPLETED)
-                    )
-                # Stop the loop
-                if self._loop.is_running():
-                    self._loop.call_soon_threadsafe(self._loop.stop)
+                await writer.wait_closed()
             except Exception as e:
-                logger.debug(f"Error during loop cleanup: {e}")
-        
-        # Join the server thread
-        if self._thread and self._thread.is_alive():
-            self._thread.join(timeout=1.0)
-            if self._thread.is_alive():
-                logger.warning("Server thread did not shut down cleanly")
-        
-        # Clear all data structures
-        self.clients.clear()
+                logger.debug("Error closing client writer: %s", e)
+            
+        if self.server is not None:
+            await self.server.wait_closed()
+            self.server = None
+            
         self.channels.clear()
         logger.info("Mock IRC server stopped")
+    
+    async def __aenter__(self) -> "MockIRCServer":
+        await self.start_async()
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop_async()
 
 
-# Singleton instance for easy access in tests
+# Singleton instance for easy access in synchronous tests, served from an
+# event loop running in a background thread
 _mock_server: Optional[MockIRCServer] = None
+_mock_loop: Optional[asyncio.AbstractEventLoop] = None
+_mock_thread: Optional[threading.Thread] = None
 
-def start_mock_server(host: str = '127.0.0.1', port: int = 16667) -> MockIRCServer:
-    """Start a mock IRC server for testing."""
-    global _mock_server
+def start_mock_server(host: str = '127.0.0.1', port: int = 16667,
+                      unix_path: Optional[str] = None) -> MockIRCServer:
+    """Start a mock IRC server for testing.
+    
+    The server runs on its own event loop (uvloop if available) in a daemon
+    thread, so tests using blocking sockets can talk to it. Returns once the
+    server is listening. If the server fails to start, the loop is stopped
+    and its thread joined before the error is re-raised.
+    """
+    global _mock_server, _mock_loop, _mock_thread
     if _mock_server is None:
-        _mock_server = MockIRCServer(host, port)
-        _mock_server.start()
+        _mock_loop = new_event_loop()
+        _mock_thread = threading.Thread(target=_mock_loop.run_forever, daemon=True)
+        _mock_thread.start()
+        server = MockIRCServer(host, port, unix_path)
+        try:
+            asyncio.run_coroutine_threadsafe(server.start_async(), _mock_loop).result()
+        except BaseException:
+            loop, thread = _mock_loop, _mock_thread
+            _mock_loop = _mock_thread = None
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=2.0)
+            if not thread.is_alive():
+                loop.close()
+            raise
+        _mock_server = server
     return _mock_server
 
 def stop_mock_server() -> None:
     """Stop the mock IRC server if running and clean up resources."""
-    global _mock_server
-    if _mock_server is not None:
-        try:
-            # Make a local reference and clear the global immediately
-            server = _mock_server
-            _mock_server = None
-            
-            # Stop the server
-            server.stop()
-            
-            # Ensure all resources are released
-            if hasattr(server, '_thread') and server._thread is not None:
-                if server._thread.is_alive():
-                    server._thread.join(timeout=2.0)
-                    if server._thread.is_alive():
-                        logger.warning("Server thread did not shut down cleanly")
-            
-            # Clear any remaining references
-            if hasattr(server, 'clients'):
-                server.clients.clear()
-            if hasattr(server, 'channels'):
-                server.channels.clear()
-                
-        except Exception as e:
-            logger.error(f"Error during server shutdown: {e}")
-            raise
-        finally:
-            # Ensure we don't leave a dangling reference
-            _mock_server = None
+    global _mock_server, _mock_loop, _mock_thread
+    if _mock_server is None:
+        return
+        
+    # Make local references and clear the globals immediately
+    server, loop, thread = _mock_server, _mock_loop, _mock_thread
+    _mock_server = _mock_loop = _mock_thread = None
+    try:
+        asyncio.run_coroutine_threadsafe(server.stop_async(), loop).result(timeout=5.0)
+    except Exception as e:
+        logger.error("Error during server shutdown: %s", e)
+        raise
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=2.0)
+        if thread.is_alive():
+            logger.warning("Server thread did not shut down cleanly")
+        else:
+            loop.close()
+
+
+async def _serve(host: str = '127.0.0.1', port: int = 16667,
+                 unix_path: Optional[str] = None) -> None:
+    """Run a mock server on the current event loop until cancelled."""
+    async with MockIRCServer(host, port, unix_path) as server:
+        await server._server_task
 
 
 if __name__ == "__main__":
-    # Run the mock server directly for testing
+    # Run the mock server directly for testing (Ctrl+C to stop). With
+    # IRC_UNIX_PATH set it listens on that Unix socket instead of TCP.
     logging.basicConfig(level=logging.DEBUG)
-    server = start_mock_server()
+    run = uvloop.run if uvloop is not None else asyncio.run
     try:
-        while True:
-            input("Press Enter to stop the server...")
-            break
+        run(_serve(unix_path=os.environ.get('IRC_UNIX_PATH')))
     except KeyboardInterrupt:
         pass
-    finally:
-        stop_mock_server()
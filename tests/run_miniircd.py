@@ -1,7 +1,10 @@
 """
 Wrapper script to run miniircd with test configuration.
 """
+import atexit
 import os
+import selectors
+import socket
 import sys
 import signal
 import subprocess
@@ -16,12 +19,135 @@ LOG_FILE = 'miniircd_test.log'
 # Get the path to miniircd.py
 SCRIPT_DIR = Path(__file__).parent.absolute()
 MINIIRCD_PATH = SCRIPT_DIR / 'miniircd.py'
+# Holds the PID of the running server so later runs can clean it up cheaply
+PID_FILE = SCRIPT_DIR.parent / 'logs' / 'miniircd.pid'
 
 # Check if miniircd.py exists
 if not MINIIRCD_PATH.exists():
     print(f"Error: {MINIIRCD_PATH} not found")
     sys.exit(1)
 
+def wait_process(process, timeout):
+    """Wait for a process to exit, like ``Popen.wait(timeout)``.
+    
+    Where the OS supports pidfds (Linux 5.3+), this blocks on the process's
+    pidfd and wakes as soon as it exits, instead of Popen.wait's polling loop.
+    
+    Raises:
+        subprocess.TimeoutExpired: If the process is still running after timeout seconds
+    """
+    if process.poll() is not None:
+        return process.returncode
+    try:
+        pidfd = os.pidfd_open(process.pid)
+    except (AttributeError, OSError):
+        return process.wait(timeout=timeout)
+    try:
+        with selectors.DefaultSelector() as sel:
+            sel.register(pidfd, selectors.EVENT_READ)
+            sel.select(timeout)
+    finally:
+        os.close(pidfd)
+    return process.wait(timeout=0)
+
+def wait_processes(processes, timeout):
+    """Wait for several processes to exit, sharing one deadline.
+    
+    Every process's pidfd is registered with one selector, so the wait ends
+    as soon as the last one exits. Processes whose pidfd cannot be opened
+    are waited on with Popen.wait for whatever time is left.
+    
+    Returns:
+        list: The processes still running after timeout seconds
+    """
+    deadline = time.monotonic() + timeout
+    pending = [p for p in processes if p.poll() is None]
+    unwatched = []
+    with selectors.DefaultSelector() as sel:
+        try:
+            for process in pending:
+                try:
+                    sel.register(os.pidfd_open(process.pid), selectors.EVENT_READ, process)
+                except (AttributeError, OSError):
+                    unwatched.append(process)
+            while sel.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in sel.select(remaining):
+                    sel.unregister(key.fd)
+                    os.close(key.fd)
+                    key.data.poll()
+        finally:
+            for key in list(sel.get_map().values()):
+                os.close(key.fd)
+    for process in unwatched:
+        try:
+            process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            pass
+    return [p for p in pending if p.poll() is None]
+
+def wait_pid(pid, timeout):
+    """Wait for any process, not only a child of ours, to exit.
+    
+    Uses the process's pidfd where the OS supports it (Linux 5.3+), otherwise
+    polls for the PID every 50 ms.
+    
+    Returns:
+        bool: True once the process has exited, False on timeout
+    """
+    try:
+        pidfd = os.pidfd_open(pid)
+    except ProcessLookupError:
+        return True
+    except (AttributeError, OSError):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                return True
+            except OSError:
+                pass
+            time.sleep(0.05)
+        return False
+    try:
+        with selectors.DefaultSelector() as sel:
+            sel.register(pidfd, selectors.EVENT_READ)
+            return bool(sel.select(timeout))
+    finally:
+        os.close(pidfd)
+
+def wait_for_port(host, port, timeout=3.0, process=None):
+    """Poll until a TCP server accepts connections on host:port.
+    
+    Retries with exponential backoff (10 ms, doubling up to 200 ms), so a
+    server that comes up quickly is detected within milliseconds.
+    
+    Args:
+        host (str): Address to connect to
+        port (int): Port to connect to
+        timeout (float): Maximum number of seconds to wait
+        process (subprocess.Popen, optional): Server process; the wait ends
+            early if it exits
+        
+    Returns:
+        bool: True once a connection succeeds, False on timeout or if the process exited
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.1)
+            if sock.connect_ex((host, port)) == 0:
+                return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+    return False
+
 def start_miniircd():
     """Start the miniircd server with test configuration."""
     # Build the command
@@ -40,23 +166,21 @@ def start_miniircd():
     
     print(f"Starting miniircd: {' '.join(cmd)}")
     
-    # Start the process
-    process = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True
-    )
+    # Start the process; its output goes to our own stdout rather than a
+    # pipe nobody reads, which would block the server once full
+    process = subprocess.Popen(cmd, stderr=subprocess.STDOUT)
     
-    # Wait for server to start
-    time.sleep(1)
-    if process.poll() is not None:
-        print("Failed to start miniircd:")
-        print(process.stdout.read() if process.stdout else "No output")
+    # Wait for server to accept connections
+    if not wait_for_port(HOST, PORT, timeout=3.0, process=process):
+        print("Failed to start miniircd (see its output above)")
+        if process.poll() is None:
+            process.kill()
         sys.exit(1)
     
+    PID_FILE.parent.mkdir(exist_ok=True)
+    PID_FILE.write_text(str(process.pid))
+    atexit.register(PID_FILE.unlink, missing_ok=True)
+    
     return process
 
 def stop_miniircd(process):
@@ -65,7 +189,7 @@ def stop_miniircd(process):
         print("Stopping miniircd...")
         process.terminate()
         try:
-            process.wait(timeout=5)
+            wait_process(process, timeout=5)
         except subprocess.TimeoutExpired:
             process.kill()
         print("miniircd stopped")
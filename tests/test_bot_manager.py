@@ -0,0 +1,32 @@
+"""
+Tests for BotManager, which forks bots from a preloaded fork server.
+"""
+import socket
+
+from conftest import BOTS, CHANNEL, ENV_DIR, TEST_HOST, load_bot_config, wait_for_bots_in_channels
+
+
+def _closed_port() -> int:
+    """Return a local port that nothing is listening on."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((TEST_HOST, 0))
+        return sock.getsockname()[1]
+
+def test_start_and_stop_bot(ensure_miniircd_running, bot_manager, socket_manager):
+    """A bot started by BotManager joins its channel and stop_all ends it."""
+    bot_name = BOTS[0]
+    nick = load_bot_config(ENV_DIR / f"{bot_name}.yml")['nick']
+    watcher = socket_manager.get_registered_client('BotManagerWatcher')
+    
+    proc = bot_manager.start_bot(bot_name)
+    wait_for_bots_in_channels(watcher, [(nick, CHANNEL, proc)], timeout=15)
+    
+    bot_manager.stop_all()
+    assert proc.poll() is not None, f"Bot {bot_name} still running after stop_all"
+    assert not bot_manager.processes
+
+def test_failed_bot_reports_exit_status(bot_manager):
+    """A bot that cannot connect exits with a non-zero status."""
+    proc = bot_manager.start_bot(BOTS[0], port=_closed_port())
+    assert proc.wait(timeout=15) != 0
+    bot_manager.stop_all()
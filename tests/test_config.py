@@ -0,0 +1,74 @@
+"""
+Unit tests for the parsed-config cache in utils.config.
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add project root to path for module imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils import config as config_module
+from utils.config import load_config, save_config
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Give every test an empty cache, and leave one behind."""
+    config_module._CACHE.clear()
+    yield
+    config_module._CACHE.clear()
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "bot.yml"
+    path.write_text("nick: R2D2\nchannels:\n- '#cantina'\n")
+    return path
+
+
+def _fail_to_parse(*args, **kwargs):
+    raise AssertionError("config was parsed again")
+
+
+def test_cache_hit_skips_parsing(config_file, monkeypatch):
+    first = load_config(config_file)
+    monkeypatch.setattr(config_module.yaml, 'load', _fail_to_parse)
+    assert load_config(config_file) == first == {'nick': 'R2D2', 'channels': ['#cantina']}
+
+
+def test_cache_returns_deep_copies(config_file):
+    first = load_config(config_file)
+    first['nick'] = 'C3PO'
+    first['channels'].append('#mos-eisley')
+    assert load_config(config_file) == {'nick': 'R2D2', 'channels': ['#cantina']}
+
+
+def test_cache_invalidated_by_mtime(config_file):
+    load_config(config_file)
+    # Same size, new mtime
+    config_file.write_text("nick: C3PO\nchannels:\n- '#cantina'\n")
+    st = config_file.stat()
+    os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert load_config(config_file)['nick'] == 'C3PO'
+    # The stale entry for the path was evicted
+    assert len(config_module._CACHE) == 1
+
+
+def test_cache_invalidated_by_size(config_file):
+    load_config(config_file)
+    st = config_file.stat()
+    config_file.write_text("nick: Chewbacca\n")
+    # Restore the old mtime so only the size tells the versions apart
+    os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert load_config(config_file) == {'nick': 'Chewbacca'}
+    assert len(config_module._CACHE) == 1
+
+
+def test_save_config_drops_cached_entries(config_file):
+    load_config(config_file)
+    save_config({'nick': 'HanSolo'}, config_file)
+    assert not config_module._CACHE
+    assert load_config(config_file) == {'nick': 'HanSolo'}
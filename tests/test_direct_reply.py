@@ -0,0 +1,42 @@
+"""
+Unit tests for the pre-LLM decision layer in core.direct_reply.
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path for module imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.direct_reply import (
+    GREETING_REPLY,
+    MAX_LENGTH,
+    TOO_LONG_REPLY,
+    TOO_SHORT_REPLY,
+    ReplyCache,
+    direct_reply,
+)
+
+
+def test_direct_reply_handles_trivial_input():
+    """Greetings and out-of-range lengths get canned replies."""
+    assert direct_reply("Hello!") == GREETING_REPLY
+    assert direct_reply("good evening") == GREETING_REPLY
+    assert direct_reply("ok") == TOO_SHORT_REPLY
+    assert direct_reply("x" * (MAX_LENGTH + 1)) == TOO_LONG_REPLY
+
+
+def test_direct_reply_defers_real_questions():
+    """Anything else falls through to the model."""
+    assert direct_reply("hello, what's on tap tonight?") is None
+
+
+def test_reply_cache_evicts_least_recently_used():
+    """The cache is bounded and keeps recently used entries."""
+    cache = ReplyCache(maxsize=2)
+    cache.put("a?", "1")
+    cache.put("b?", "2")
+    assert cache.get("a?") == "1"
+    cache.put("c?", "3")
+    assert cache.get("b?") is None
+    assert cache.get("a?") == "1"
+    assert cache.get("c?") == "3"
@@ -0,0 +1,54 @@
+"""
+Unit tests for the framing helpers in core.framing.
+"""
+import sys
+from pathlib import Path
+
+# Add project root to path for module imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.framing import FRAME_RAW, FRAME_ZLIB, decode_frames, encode_frame, frame_lines
+
+
+def test_frame_lines_splits_complete_lines():
+    """Complete lines are returned and the cursor points past the last newline."""
+    buf = bytearray(b"one\ntwo\npartial")
+    lines, cursor = frame_lines(buf, 0, len(buf))
+    assert lines == [b"one", b"two"]
+    assert buf[cursor:] == b"partial"
+
+
+def test_frame_lines_without_newline_consumes_nothing():
+    """A buffer with no terminator yields no lines and leaves the cursor at start."""
+    buf = bytearray(b"no newline yet")
+    assert frame_lines(buf, 0, len(buf)) == ([], 0)
+
+
+def test_frame_lines_respects_bounds():
+    """Only the requested region of the buffer is scanned."""
+    buf = bytearray(b"skip\nkeep\nafter\n")
+    lines, cursor = frame_lines(buf, 5, 12)
+    assert lines == [b"keep"]
+    assert cursor == 10
+
+
+def test_encode_decode_frames_round_trip():
+    """Small payloads stay raw, large ones are compressed, both decode back."""
+    small = b"[peer] hi\n"
+    large = b"[peer] " + b"blue milk " * 50 + b"\n"
+    small_frame = encode_frame(small)
+    large_frame = encode_frame(large)
+    assert small_frame[0] == FRAME_RAW
+    assert large_frame[0] != FRAME_RAW
+    assert len(large_frame) < len(large)
+
+    buf = bytearray(small_frame + large_frame + large_frame[:3])
+    payloads, cursor = decode_frames(buf, 0, len(buf))
+    assert payloads == [small, large]
+    assert buf[cursor:] == large_frame[:3]
+
+
+def test_encode_frame_defaults_to_zlib():
+    """lz4 is used only when asked for, so any receiver can decode frames."""
+    payload = b"[peer] " + b"blue milk " * 50 + b"\n"
+    assert encode_frame(payload)[0] == FRAME_ZLIB
@@ -9,6 +9,8 @@ Tests are designed to be run against a local miniircd instance and verify
 both client-server interactions and server-side behavior.
 """
 
+import asyncio
+import itertools
 import os
 import select
 import socket
@@ -17,29 +19,38 @@ import unittest
 import logging
 import sys
 from pathlib import Path
-from functools import wraps
-from typing import Optional, Callable, Any
+from typing import Optional, List, Union
 
-# Configure logging
+import pytest
+
+# Configure logging; set IRC_TEST_LOG=DEBUG to see the protocol traffic
+LOG_LEVEL = os.environ.get('IRC_TEST_LOG', 'INFO').upper()
+# getLevelName maps a known level name to its number, anything else to a string
+_log_level_valid = isinstance(logging.getLevelName(LOG_LEVEL), int)
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=LOG_LEVEL if _log_level_valid else logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     stream=sys.stdout
 )
 logger = logging.getLogger(__name__)
+if not _log_level_valid:
+    logger.warning("Ignoring invalid IRC_TEST_LOG level %r; using INFO", LOG_LEVEL)
+    LOG_LEVEL = 'INFO'
+logger.setLevel(LOG_LEVEL)  # conftest may have configured the root logger first
 
-# Add a small delay between operations to prevent flooding
-def delay_after(delay: float = 0.1) -> Callable:
-    """Decorator to add a small delay after function execution."""
-    def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def wrapper(*args, **kwargs) -> Any:
-            try:
-                return func(*args, **kwargs)
-            finally:
-                time.sleep(delay)
-        return wrapper
-    return decorator
+# Space appended to the receive buffer for each recv_into
+_RECV_SLAB = bytes(4096)
+
+# Replies built from raw received bytes, without a decode/encode round trip
+_PONG_PREFIX = b'PONG '
+
+# A local server may also listen on a Unix-domain socket; set IRC_UNIX_PATH
+# to connect to it there and skip the TCP stack entirely
+_LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+def _unix_path_for(host: str) -> Optional[str]:
+    """Return the Unix socket path to use instead of TCP for host, if any."""
+    return os.environ.get('IRC_UNIX_PATH') if host in _LOOPBACK_HOSTS else None
 
 class IRCClient:
     """A simple IRC client for testing purposes.
@@ -51,15 +62,18 @@ class IRCClient:
     Attributes:
         host (str): The IRC server hostname or IP address
         port (int): The IRC server port number
+        unix_path (str): Unix socket used instead of host/port, if set
         socket (socket.socket): The underlying socket connection
-        buffer (bytes): Buffer for incoming data
+        buffer (bytearray): Buffer for incoming data
     """
     
     def __init__(self, host: str, port: int):
         self.host = host
         self.port = port
+        self.unix_path = _unix_path_for(host)
         self.socket = None
-        self.buffer = b''
+        self.buffer = bytearray()
+        self._scan_pos = 0  # Start of the part of buffer not yet searched for CRLF
         self.connect()
     
     def connect(self, max_retries: int = 3, retry_delay: float = 1.0) -> None:
@@ -69,66 +83,165 @@ class IRCClient:
                 if self.socket:
                     self.socket.close()
                 
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.socket.settimeout(5.0)
-                self.socket.connect((self.host, self.port))
-                logger.info(f"Connected to {self.host}:{self.port}")
+                if self.unix_path:
+                    self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    self.socket.settimeout(5.0)
+                    self.socket.connect(self.unix_path)
+                else:
+                    self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    self.socket.settimeout(5.0)
+                    # Send small commands immediately rather than waiting to coalesce them
+                    self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self.socket.connect((self.host, self.port))
+                # Reads are gated by select, so skip the per-call timeout handling
+                self.socket.setblocking(False)
+                logger.info("Connected to %s", self.unix_path or f"{self.host}:{self.port}")
                 return
             except (ConnectionRefusedError, socket.timeout, OSError) as e:
                 if attempt == max_retries - 1:
-                    logger.error(f"Failed to connect after {max_retries} attempts")
+                    logger.error("Failed to connect after %s attempts", max_retries)
                     raise
-                logger.warning(f"Connection attempt {attempt + 1} failed: {e}")
+                logger.warning("Connection attempt %s failed: %s", attempt + 1, e)
                 time.sleep(retry_delay)
     
-    def send_cmd(self, cmd: str, ensure_newline: bool = True) -> None:
-        """Send a command to the IRC server."""
-        if not cmd.endswith('\r\n') and ensure_newline:
-            cmd += '\r\n'
-        logger.debug(f"Sending: {cmd.strip()}")
+    def send_cmd(self, cmd: Union[str, bytes, List[str]], ensure_newline: bool = True) -> None:
+        """Send a command, or a list of commands, to the IRC server.
+        
+        A command given as bytes is sent without being re-encoded.
+        """
+        if isinstance(cmd, list):
+            self.send_cmds(cmd)
+            return
+        payload = cmd.encode('utf-8') if isinstance(cmd, str) else cmd
+        if not payload.endswith(b'\r\n') and ensure_newline:
+            payload += b'\r\n'
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending: %s", payload.strip().decode('utf-8', errors='replace'))
         try:
-            self.socket.sendall(cmd.encode('utf-8'))
+            self._send_all(payload)
         except (ConnectionResetError, BrokenPipeError) as e:
-            logger.error(f"Connection lost while sending: {e}")
+            logger.error("Connection lost while sending: %s", e)
             self.connect()  # Try to reconnect
-            self.socket.sendall(cmd.encode('utf-8'))  # Retry send
+            self._send_all(payload)  # Retry send
+    
+    def _send_all(self, payload: bytes, timeout: float = 5.0) -> None:
+        """Write all of *payload* to the non-blocking socket.
+        
+        ``sendall`` on a non-blocking socket raises BlockingIOError after a
+        partial write, so wait for the socket to become writable instead.
+        """
+        view = memoryview(payload)
+        deadline = time.monotonic() + timeout
+        while view:
+            try:
+                view = view[self.socket.send(view):]
+                continue
+            except BlockingIOError:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([], [self.socket], [], remaining)[1]:
+                raise socket.timeout(f"Timed out sending {len(view)} of {len(payload)} bytes")
+    
+    def send_cmds(self, cmds: List[str]) -> None:
+        """Send several commands to the IRC server in a single write."""
+        payload = b'\r\n'.join(c.encode('utf-8') for c in cmds) + b'\r\n'
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending: %s", ' | '.join(cmds))
+        try:
+            self._send_all(payload)
+        except (ConnectionResetError, BrokenPipeError) as e:
+            logger.error("Connection lost while sending: %s", e)
+            self.connect()  # Try to reconnect
+            self._send_all(payload)  # Retry send
+    
+    def recv_line(self, timeout: float = 5.0) -> Optional[bytes]:
+        """Return the next line from the server, without its CRLF.
+        
+        Bytes already searched are not scanned again on the next call, so
+        reading a long response line by line costs O(n) rather than O(n^2).
+        
+        Returns:
+            bytes: The line, or None if no complete line arrives within
+            timeout seconds or the connection is closed
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            idx = self.buffer.find(b'\r\n', self._scan_pos)
+            if idx >= 0:
+                line = bytes(self.buffer[:idx])
+                del self.buffer[:idx + 2]
+                self._scan_pos = 0
+                return line
+            # A CR at the very end may still be followed by its LF
+            self._scan_pos = max(0, len(self.buffer) - 1)
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([self.socket], [], [], remaining)
+            if not ready:
+                return None
+            try:
+                if not self._fill_buffer():  # Connection closed
+                    return None
+            except BlockingIOError:  # Spurious wakeup
+                continue
+            except (socket.timeout, ConnectionResetError, BrokenPipeError) as e:
+                logger.warning("Socket error while receiving: %s", e)
+                return None
+    
+    def _fill_buffer(self) -> int:
+        """Receive straight into the end of buffer and return the byte count."""
+        end = len(self.buffer)
+        self.buffer.extend(_RECV_SLAB)
+        n = 0
+        try:
+            with memoryview(self.buffer)[end:] as view:
+                n = self.socket.recv_into(view)
+        finally:
+            del self.buffer[end + n:]
+        return n
     
     def recv_until(self, expected: str, timeout: float = 5.0) -> str:
         """Receive data until expected string is found or timeout occurs."""
         data = self.buffer
-        start_time = time.time()
+        deadline = time.monotonic() + timeout
         expected_bytes = expected.encode('utf-8')
+        scan_pos = 0  # Bytes before this were already searched
+        found = False
         
-        while time.time() - start_time < timeout:
+        while True:
             try:
                 # Check if we already have the expected data in buffer
-                if expected_bytes in data:
+                if data.find(expected_bytes, scan_pos) >= 0:
+                    found = True
+                    break
+                # A match may still start in the last len(expected) - 1 bytes
+                scan_pos = max(0, len(data) - len(expected_bytes) + 1)
+                
+                # Sleep until data arrives or the deadline passes
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                ready = select.select([self.socket], [], [], remaining)
+                if ready[0] and not self._fill_buffer():  # Connection closed
                     break
-                    
-                # Wait for data with a short timeout to be responsive
-                ready = select.select([self.socket], [], [], 0.1)
-                if ready[0]:
-                    chunk = self.socket.recv(4096)
-                    if not chunk:  # Connection closed
-                        break
-                    data += chunk
-                    
-                    # Check again after receiving new data
-                    if expected_bytes in data:
-                        break
                         
+            except BlockingIOError:  # Spurious wakeup
+                continue
             except (socket.timeout, ConnectionResetError, BrokenPipeError) as e:
-                logger.warning(f"Socket error while receiving: {e}")
+                logger.warning("Socket error while receiving: %s", e)
                 break
         
-        # Save any remaining data for next read
-        self.buffer = data[data.rfind(b'\n') + 1:] if b'\n' in data else data
         response = data.decode('utf-8', errors='ignore')
+        # Keep any partial line for the next read (rfind gives -1 if none)
+        del data[:data.rfind(b'\n') + 1]
+        self._scan_pos = 0
         
-        if expected_bytes not in data:
-            logger.warning(f"Did not find '{expected}' in response. Got: {response}")
-        else:
-            logger.debug(f"Received: {response.strip()}")
+        if not found:
+            logger.warning("Did not find '%s' in response. Got: %s", expected, response)
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received: %s", response.strip())
             
         return response
     
@@ -141,18 +254,88 @@ class IRCClient:
                 pass
             self.socket = None
 
-# Test configuration - use the same settings as in test_irc_bots.py
-from test_irc_bots import IRC_HOST as HOST, IRC_PORT as PORT
+class AsyncIRCClient:
+    """asyncio counterpart of IRCClient.
+    
+    Any number of these can run on one event loop, so independent sessions
+    wait on the server concurrently instead of one after another.
+    
+    Attributes:
+        host (str): The IRC server hostname or IP address
+        port (int): The IRC server port number
+        unix_path (str): Unix socket used instead of host/port, if set
+        reader (asyncio.StreamReader): Incoming side of the connection
+        writer (asyncio.StreamWriter): Outgoing side of the connection
+    """
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.unix_path = _unix_path_for(host)
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+    
+    async def connect(self) -> None:
+        """Connect to the IRC server."""
+        if self.unix_path:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        logger.info("Connected to %s", self.unix_path or f"{self.host}:{self.port}")
+    
+    async def send_cmds(self, cmds: List[str]) -> None:
+        """Send several commands to the IRC server in a single write."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending: %s", ' | '.join(cmds))
+        self.writer.write(b'\r\n'.join(c.encode('utf-8') for c in cmds) + b'\r\n')
+        await self.writer.drain()
+    
+    async def send_cmd(self, cmd: Union[str, bytes]) -> None:
+        """Send a command to the IRC server; bytes are sent without re-encoding."""
+        payload = cmd.encode('utf-8') if isinstance(cmd, str) else cmd
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending: %s", payload.decode('utf-8', errors='replace'))
+        self.writer.write(payload + b'\r\n')
+        await self.writer.drain()
+    
+    async def recv_line(self, timeout: float = 5.0) -> Optional[bytes]:
+        """Return the next line from the server, without its CRLF.
+        
+        Returns:
+            bytes: The line, or None if no complete line arrives within
+            timeout seconds or the connection is closed
+        """
+        try:
+            line = await asyncio.wait_for(self.reader.readuntil(b'\r\n'), timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return None
+        return line[:-2]
+    
+    async def close(self) -> None:
+        """Close the connection."""
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+            self.writer = None
+
+# Test configuration - use the same server settings as conftest.py
+from conftest import TEST_HOST as HOST, TEST_PORT as PORT
 
 # Constants for testing
+_NICK_COUNTER = itertools.count()
+
 def get_unique_nick() -> str:
-    """Generate a unique nickname with timestamp to avoid conflicts.
+    """Generate a unique nickname to avoid conflicts.
     
     Returns:
-        str: A unique nickname in the format 'testbot_XXXX' where XXXX is a 
-             timestamp-derived number between 0 and 9999.
+        str: A nickname in the format 'testbot_XXXX_N' where XXXX is a
+             clock-derived number that separates runs and N is a counter
+             that keeps nicks unique within this process.
     """
-    return f'testbot_{int(time.time() * 1000) % 10000}'
+    return f'testbot_{(time.monotonic_ns() // 1000) & 0xFFFF}_{next(_NICK_COUNTER)}'
 
 # Get a unique nickname for this test run
 NICK = get_unique_nick()
@@ -162,6 +345,7 @@ CHANNEL = '#test'
 # Global client instance for tests
 TEST_CLIENT: Optional[IRCClient] = None
 
+@pytest.mark.usefixtures("ensure_miniircd_running")
 class TestMiniIRCDConnection(unittest.TestCase):
     """Test cases for miniircd server connection.
     
@@ -179,14 +363,41 @@ class TestMiniIRCDConnection(unittest.TestCase):
     def setUpClass(cls):
         """Set up test class.
         
-        Initializes the IRC client connection that will be used by all test methods.
-        This runs once before any tests in the class are executed.
+        Connects and registers the IRC session that is shared by all test
+        methods. This runs once before any tests in the class are executed.
+        
+        Raises:
+            AssertionError: If the server does not send its welcome message
         """
         global TEST_CLIENT
+        # IRCClient.connect retries until the server accepts connections
         TEST_CLIENT = IRCClient(HOST, PORT)
         
-        # Wait a bit to ensure server is ready
-        time.sleep(0.5)
+        # Register once; NICK and USER go in one write
+        TEST_CLIENT.send_cmds([f'NICK {NICK}', f'USER {USER}'])
+        
+        # Wait for welcome message (001)
+        logger.debug("Waiting for welcome message...")
+        response = ''
+        start_time = time.monotonic()
+        while time.monotonic() - start_time < 10:  # 10 second timeout
+            raw = TEST_CLIENT.recv_line(timeout=1)
+            if not raw:
+                continue
+            line = raw.decode('utf-8', errors='ignore')
+            
+            logger.debug("Received: %s", line)
+            response += line + '\r\n'
+            if ' 001 ' in line:
+                logger.debug("Registration successful")
+                return
+            
+            # Check for PING and respond immediately
+            if raw.startswith(b'PING'):
+                TEST_CLIENT.send_cmd(_PONG_PREFIX + raw[5:])
+        
+        logger.error("Did not receive welcome message. Server response: %s", response)
+        raise AssertionError("Did not receive welcome message (001)")
     
     @classmethod
     def tearDownClass(cls):
@@ -203,129 +414,50 @@ class TestMiniIRCDConnection(unittest.TestCase):
     def setUp(self):
         """Set up the test client.
         
-        Initializes a fresh IRC client connection with a unique nickname
-        before each test method runs. This ensures test isolation.
+        Reuses the session registered in setUpClass and gives it a fresh
+        unique nickname, which is much cheaper than a new connection and
+        registration per test.
         """
-        self.nick = get_unique_nick()
-        self.client = IRCClient(HOST, PORT)
-        self.client.connect()
-        self.client.buffer = b''  # Clear buffer before each test
+        self.client = TEST_CLIENT
+        self.client.buffer.clear()  # Clear buffer before each test
+        self.client._scan_pos = 0
         self.nick = get_unique_nick()  # Unique nick per test
-        
-        # Enable debug logging for this test
-        logger.setLevel(logging.DEBUG)
-        
-        # Add a console handler if not already present
-        if not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
-            console = logging.StreamHandler()
-            console.setLevel(logging.DEBUG)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            console.setFormatter(formatter)
-            logger.addHandler(console)
+        self.client.send_cmd(f'NICK {self.nick}')
     
-    # Removed old send_cmd method - using IRCClient now
+    # Removed old send_cmd and recv_until methods - using IRCClient now
     
-    def recv_until(self, expected, timeout=5):
-        """
-        Receive data until expected string is found or timeout occurs.
+    def test_nick_change_and_ping(self):
+        """Test that the server confirms a NICK change and answers PING.
         
-        Args:
-            expected: String to look for in the response
-            timeout: Maximum time to wait in seconds
-            
-        Returns:
-            str: All received data as a string
+        Connecting and registering happen once, in setUpClass; this test
+        checks the NICK sent by setUp on the shared session.
         """
-        data = self.client.buffer
-        start_time = time.time()
-        expected_bytes = expected.encode('utf-8')
-        
-        while time.time() - start_time < timeout:
-            try:
-                # Check if we already have the expected data in buffer
-                if expected_bytes in data:
-                    break
-                    
-                # Wait for data with a short timeout to be responsive
-                ready = select.select([self.client.socket], [], [], 0.1)
-                if ready[0]:
-                    chunk = self.client.socket.recv(4096)
-                    if not chunk:  # Connection closed
-                        break
-                    data += chunk
-                    
-                    # Check again after receiving new data
-                    if expected_bytes in data:
-                        break
-                        
-            except (socket.timeout, ConnectionResetError, BrokenPipeError) as e:
-                logger.warning(f"Socket error while receiving: {e}")
-                break
-        
-        # Save any remaining data for next read
-        self.client.buffer = data[data.rfind(b'\n') + 1:] if b'\n' in data else data
-        response = data.decode('utf-8', errors='ignore')
-        
-        if expected_bytes not in data:
-            logger.warning(f"Did not find '{expected}' in response. Got: {response}")
-        else:
-            logger.debug(f"Received: {response.strip()}")
-            
-        return response
-    
-    @delay_after(0.2)  # Add small delay after test
-    def test_connection_and_registration(self):
-        """Test connecting to the server and registering a user."""
         try:
-            # First, send NICK and USER commands as required by IRC protocol
-            logger.debug(f"Sending NICK {self.nick}")
-            self.client.send_cmd(f'NICK {self.nick}')
-            time.sleep(0.2)  # Small delay
-            
-            # Send USER command with matching username
-            user_cmd = f'USER {self.nick} 0 * :Test Bot'
-            logger.debug(f"Sending {user_cmd}")
-            self.client.send_cmd(user_cmd)
-            time.sleep(0.2)  # Small delay
-            
-            # Wait for welcome message (001)
-            logger.debug("Waiting for welcome message...")
-            response = ''
-            start_time = time.time()
-            welcome_received = False
-            
-            while time.time() - start_time < 10:  # 10 second timeout
-                try:
-                    # Read one line at a time
-                    line = self.client.recv_until('\r\n', timeout=1).strip()
-                    if not line:
-                        continue
-                        
-                    logger.debug(f"Received: {line}")
-                    response += line + '\r\n'
-                    # Check for welcome message (001)
-                    if ' 001 ' in line:
-                        welcome_received = True
-                        logger.debug("Received welcome message (001)")
-                        break
-                        
-                    # Check for PING and respond immediately
-                    if line.startswith('PING'):
-                        ping_id = line.split(' ', 1)[1] if ' ' in line else ''
-                        logger.debug(f"Responding to PING with PONG {ping_id}")
-                        self.client.send_cmd(f'PONG {ping_id}')
-                        
-                except Exception as e:
-                    if 'timed out' not in str(e):
-                        logger.error(f"Error during registration: {e}")
-                        break
+            # setUp renamed the shared, already registered session
+            logger.debug("Waiting for nick change to %s...", self.nick)
+            nick_changed = False
+            start_time = time.monotonic()
             
-            # Verify we got the welcome message
-            if not welcome_received:
-                logger.error(f"Did not receive welcome message. Server response: {response}")
-                self.fail("Did not receive welcome message (001)")
+            while time.monotonic() - start_time < 10:  # 10 second timeout
+                raw = self.client.recv_line(timeout=1)
+                if not raw:
+                    continue
+                line = raw.decode('utf-8', errors='ignore')
                 
-            logger.debug("Registration successful")
+                logger.debug("Received: %s", line)
+                # Format: :oldnick!user@host NICK newnick
+                if ' NICK ' in line and self.nick in line:
+                    nick_changed = True
+                    logger.debug("Nick change confirmed")
+                    break
+                
+                # Check for PING and respond immediately
+                if raw.startswith(b'PING'):
+                    logger.debug("Responding to PING with PONG %r", raw[5:])
+                    self.client.send_cmd(_PONG_PREFIX + raw[5:])
+            
+            if not nick_changed:
+                self.fail(f"Server did not confirm nick change to {self.nick}")
             
             # Test PING/PONG
             logger.debug("Testing PING/PONG...")
@@ -334,63 +466,71 @@ class TestMiniIRCDConnection(unittest.TestCase):
             
             # Wait for PONG response
             pong_received = False
-            start_time = time.time()
-            while time.time() - start_time < 5:  # 5 second timeout
+            start_time = time.monotonic()
+            while time.monotonic() - start_time < 5:  # 5 second timeout
                 try:
-                    line = self.client.recv_until('\r\n', timeout=1).strip()
+                    line = self.client.recv_line(timeout=1)
                     if not line:
                         continue
+                    line = line.decode('utf-8', errors='ignore')
                         
-                    logger.debug(f"PING/PONG check: {line}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("PING/PONG check: %s", line)
                     
-                    # Check for PONG response
-                    if line.startswith('PONG') and ping_id in line:
+                    # Check for PONG response (":server PONG server :id" from
+                    # miniircd, a bare "PONG :id" from the mock server)
+                    if (line.startswith('PONG') or ' PONG ' in line) and ping_id in line:
                         pong_received = True
                         logger.debug("Received PONG response")
                         break
                         
                 except Exception as e:
                     if 'timed out' not in str(e):
-                        logger.error(f"Error during PING/PONG: {e}")
+                        logger.error("Error during PING/PONG: %s", e)
                         break
             
             if not pong_received:
                 logger.warning("Did not receive PONG response")
             
             # Join a channel
-            logger.debug(f"Joining channel {CHANNEL}")
+            logger.debug("Joining channel %s", CHANNEL)
             self.client.send_cmd(f'JOIN {CHANNEL}')
             
             # Wait for join confirmation
             join_confirmed = False
             names_received = False
             names_response = ''  # Initialize names_response
-            start_time = time.time()
+            # Match against the raw lines; build the needles once
+            join_needle = f'JOIN {CHANNEL}'.encode()
+            nick_b = self.nick.encode()
+            channel_b = CHANNEL.encode()
+            start_time = time.monotonic()
             
-            while time.time() - start_time < 10:  # 10 second timeout
+            while time.monotonic() - start_time < 10:  # 10 second timeout
                 try:
-                    line = self.client.recv_until('\r\n', timeout=1).strip()
+                    line = self.client.recv_line(timeout=1)
                     if not line:
                         continue
                         
-                    logger.debug(f"Join response: {line}")
+                    logger.debug("Join response: %r", line)
                     
                     # Check for JOIN confirmation
-                    if f'JOIN {CHANNEL}' in line and self.nick in line:
+                    if join_needle in line and nick_b in line:
                         join_confirmed = True
                         logger.debug("Received JOIN confirmation")
                     
                     # Check for NAMES list
-                    if ' 353 ' in line and CHANNEL in line:  # 353 is RPL_NAMREPLY
+                    if b' 353 ' in line and channel_b in line:  # 353 is RPL_NAMREPLY
                         names_received = True
                         logger.debug("Received NAMES list")
                     
-                    if join_confirmed and names_received:
+                    # 366 (RPL_ENDOFNAMES) ends the join sequence
+                    if b' 366 ' in line and channel_b in line:
                         break
                         
                 except Exception as e:
                     if 'timed out' not in str(e):
-                        logger.error(f"Error during channel join: {e}")
+                        logger.error("Error during channel join: %s", e)
                         break
             
             if not join_confirmed:
@@ -402,57 +542,62 @@ class TestMiniIRCDConnection(unittest.TestCase):
                 self.client.send_cmd(f'NAMES {CHANNEL}')
                 try:
                     names_response = self.client.recv_until('End of /NAMES list', timeout=5)
-                    logger.debug(f"NAMES response: {names_response}")
+                    logger.debug("NAMES response: %s", names_response)
                     names_received = True
                 except Exception as e:
-                    logger.error(f"Error getting NAMES list: {e}")
+                    logger.error("Error getting NAMES list: %s", e)
             
             # Verify our nick is in the channel
             if not names_received or self.nick not in names_response:
-                logger.warning(f"{self.nick} not found in channel {CHANNEL}")
+                logger.warning("%s not found in channel %s", self.nick, CHANNEL)
                 # Continue anyway as some servers might not show us in our own NAMES list
             
         except Exception as e:
-            logger.error(f"Test failed: {e}", exc_info=True)
+            logger.error("Test failed: %s", e, exc_info=True)
             raise
         
-        # Small delay to ensure channel is ready
-        time.sleep(0.5)
-        
-        # Send a test message
+        # Send a test message, followed by a PING. The server handles commands
+        # in order, so once the PONG is back no echo is still on its way.
         test_msg = f"Hello, miniircd! {time.time()}"  # Add timestamp to make message unique
-        logger.debug(f"Sending PRIVMSG to {CHANNEL}: {test_msg}")
+        logger.debug("Sending PRIVMSG to %s: %s", CHANNEL, test_msg)
         privmsg_cmd = f'PRIVMSG {CHANNEL} :{test_msg}'
-        self.client.send_cmd(privmsg_cmd)
+        fence_id = f"echo-{time.time()}"
+        self.client.send_cmds([privmsg_cmd, f'PING :{fence_id}'])
         
         # Wait for the message to be echoed back
         logger.debug("Waiting for message echo...")
         message_received = False
-        start_time = time.time()
+        needle = privmsg_cmd.encode()
+        fence_b = fence_id.encode()
+        start_time = time.monotonic()
         
-        while time.time() - start_time < 10:  # 10 second timeout
+        while time.monotonic() - start_time < 10:  # 10 second timeout
             try:
-                line = self.client.recv_until('\r\n', timeout=1).strip()
+                line = self.client.recv_line(timeout=1)
                 if not line:
                     continue
                     
-                logger.debug(f"Received: {line}")
+                logger.debug("Received: %r", line)
                 
                 # Check if this is our message being echoed back
                 # Format: :nick!user@host PRIVMSG #channel :message
-                if f'PRIVMSG {CHANNEL} :{test_msg}' in line:
+                if needle in line:
                     message_received = True
                     logger.debug("Received our message back from server")
                     break
+                
+                if (line.startswith(b'PONG') or b' PONG ' in line) and fence_b in line:
+                    logger.debug("Server processed the message without echoing it")
+                    break
                     
                 # Check for any error messages
-                if line.startswith('ERROR') or ' 40' in line or ' 50' in line:
-                    logger.error(f"Server error: {line}")
+                if line.startswith(b'ERROR') or b' 40' in line or b' 50' in line:
+                    logger.error("Server error: %r", line)
                     break
                     
             except Exception as e:
                 if 'timed out' not in str(e):
-                    logger.error(f"Error receiving message: {e}")
+                    logger.error("Error receiving message: %s", e)
                     break
         
         # Log the result
@@ -464,16 +609,24 @@ class TestMiniIRCDConnection(unittest.TestCase):
             # Try one more time with a simpler message
             logger.debug("Trying again with a simpler message...")
             test_msg = "TEST"
-            self.client.send_cmd(f'PRIVMSG {CHANNEL} :{test_msg}')
+            privmsg_cmd = f'PRIVMSG {CHANNEL} :{test_msg}'
+            fence_id = f"echo-{time.time()}"
+            self.client.send_cmds([privmsg_cmd, f'PING :{fence_id}'])
+            needle = privmsg_cmd.encode()
+            fence_b = fence_id.encode()
             
-            start_time = time.time()
-            while time.time() - start_time < 5:  # 5 second timeout
+            start_time = time.monotonic()
+            while time.monotonic() - start_time < 5:  # 5 second timeout
                 try:
-                    line = self.client.recv_until('\r\n', timeout=1).strip()
-                    if line and f'PRIVMSG {CHANNEL} :{test_msg}' in line:
+                    line = self.client.recv_line(timeout=1)
+                    if not line:
+                        continue
+                    if needle in line:
                         logger.info("SUCCESS: Simple message was echoed back")
                         message_received = True
                         break
+                    if (line.startswith(b'PONG') or b' PONG ' in line) and fence_b in line:
+                        break
                 except:
                     pass
         
@@ -484,9 +637,109 @@ class TestMiniIRCDConnection(unittest.TestCase):
             
         # Comment out the assertion for now while debugging
         # self.assertTrue(message_received, "Did not receive echoed message from server")
-        
-        # Quit
-        self.client.send_cmd('QUIT :Test complete')
+
+@pytest.mark.usefixtures("ensure_miniircd_running")
+class TestMiniIRCDConcurrentSessions(unittest.IsolatedAsyncioTestCase):
+    """Test several sessions registering and joining a channel at once.
+    
+    All sessions share one event loop, so the test takes about as long as
+    the slowest session rather than the sum of all of them.
+    """
+    
+    SESSIONS = 5
+    
+    async def asyncSetUp(self):
+        """Open all client connections concurrently."""
+        self.clients = [AsyncIRCClient(HOST, PORT) for _ in range(self.SESSIONS)]
+        await asyncio.gather(*(client.connect() for client in self.clients))
+    
+    async def asyncTearDown(self):
+        """Send QUIT on every session and close the connections."""
+        async def quit(client: AsyncIRCClient) -> None:
+            try:
+                await client.send_cmd('QUIT :Test complete')
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+            await client.close()
+        await asyncio.gather(*(quit(client) for client in self.clients))
+    
+    async def _wait_for(self, client: AsyncIRCClient, needle: bytes, timeout: float = 10.0) -> bool:
+        """Read lines until one contains needle, answering PINGs on the way."""
+        deadline = time.monotonic() + timeout
+        while True:
+            line = await client.recv_line(timeout=deadline - time.monotonic())
+            if line is None:
+                return False
+            logger.debug("Received: %r", line)
+            if needle in line:
+                return True
+            if line.startswith(b'PING'):
+                await client.send_cmd(_PONG_PREFIX + line[5:])
+    
+    async def _register_and_join(self, client: AsyncIRCClient) -> bool:
+        """Register client under a fresh nick and join CHANNEL."""
+        nick = get_unique_nick()
+        await client.send_cmds([f'NICK {nick}', f'USER {nick} 0 * :Test Bot'])
+        if not await self._wait_for(client, b' 001 '):
+            return False
+        await client.send_cmd(f'JOIN {CHANNEL}')
+        # 366 (RPL_ENDOFNAMES) ends the join sequence
+        return await self._wait_for(client, b' 366 ')
+    
+    async def test_concurrent_registration(self):
+        """Test that every session completes registration and JOIN."""
+        results = await asyncio.gather(*(self._register_and_join(c) for c in self.clients))
+        self.assertTrue(all(results), f"Sessions that did not finish joining: {results.count(False)}")
+
+@pytest.fixture
+def mock_unix_server(tmp_path, monkeypatch):
+    """Serve the backup MockIRCServer on a Unix socket and point IRC_UNIX_PATH at it.
+
+    miniircd only listens on TCP, so the mock server is what exercises the
+    clients' AF_UNIX path.
+
+    Yields:
+        str: Path of the Unix socket the server listens on
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip("Unix-domain sockets are not available")
+    monkeypatch.syspath_prepend(str(Path(__file__).parent / 'backup'))
+    mock_irc_server = pytest.importorskip('mock_irc_server')
+    unix_path = str(tmp_path / 'irc.sock')
+    mock_irc_server.start_mock_server(unix_path=unix_path)
+    monkeypatch.setenv('IRC_UNIX_PATH', unix_path)
+    try:
+        yield unix_path
+    finally:
+        mock_irc_server.stop_mock_server()
+
+def test_register_over_unix_socket(mock_unix_server):
+    """IRCClient connects through IRC_UNIX_PATH and registers there."""
+    client = IRCClient(HOST, PORT)
+    try:
+        assert client.unix_path == mock_unix_server
+        assert client.socket.family == socket.AF_UNIX
+        nick = get_unique_nick()
+        client.send_cmds([f'NICK {nick}', f'USER {nick} 0 * :Test Bot'])
+        assert f' 001 {nick} ' in client.recv_until(f' 001 {nick} ', timeout=5)
+    finally:
+        client.close()
+
+def test_async_register_over_unix_socket(mock_unix_server):
+    """AsyncIRCClient connects through IRC_UNIX_PATH and registers there."""
+    async def register() -> Optional[bytes]:
+        client = AsyncIRCClient(HOST, PORT)
+        await client.connect()
+        try:
+            assert client.writer.get_extra_info('socket').family == socket.AF_UNIX
+            nick = get_unique_nick()
+            await client.send_cmds([f'NICK {nick}', f'USER {nick} 0 * :Test Bot'])
+            return await client.recv_line(timeout=5)
+        finally:
+            await client.close()
+
+    line = asyncio.run(register())
+    assert line is not None and b' 001 ' in line, f"Expected a welcome (001), got {line!r}"
 
 if __name__ == '__main__':
     unittest.main()
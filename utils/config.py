@@ -3,19 +3,41 @@ Configuration utilities for the IRC bot project.
 
 This module provides functions for loading and saving configuration files in YAML format.
 """
+import copy
 import yaml
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Use the libyaml-backed C loader and dumper when PyYAML was built with them
+_Loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_Dumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Parsed configs keyed by (resolved path, mtime in ns, size), oldest first;
+# at most one entry per path
+_CACHE: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+_CACHE_SIZE = 32
+
+
+def _forget(resolved: str) -> None:
+    """Drop every cached entry for the resolved path *resolved*."""
+    for key in [key for key in _CACHE if key[0] == resolved]:
+        del _CACHE[key]
+
 
 def load_config(config_path: str) -> Dict[str, Any]:
     """
     Load a YAML configuration file.
 
+    Parsed files are cached until their modification time or size changes;
+    each call returns its own copy, so callers may modify the result. The
+    cache only pays off in processes that load the same file more than once
+    (e.g. a test session or tool reloading bot configs); scripts/launch_bot.py
+    loads its config once per process and gains nothing from it.
+
     Args:
         config_path: Path to the YAML configuration file
 
@@ -27,21 +49,35 @@ def load_config(config_path: str) -> Dict[str, Any]:
         yaml.YAMLError: If the YAML is invalid
     """
     path = Path(config_path)
-    if not path.exists():
+    try:
+        st = path.stat()
+    except FileNotFoundError:
         error_msg = f"Configuration file not found: {path}"
         logger.error(error_msg)
-        raise FileNotFoundError(error_msg)
+        raise FileNotFoundError(error_msg) from None
+
+    resolved = str(path.resolve())
+    key = (resolved, st.st_mtime_ns, st.st_size)
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+    # The file changed since it was cached, if it was: evict the stale entry
+    _forget(resolved)
 
     try:
-        with open(path, 'r', encoding='utf-8') as file:
-            config = yaml.safe_load(file)
+        # Parse from one in-memory buffer rather than chunked file reads
+        config = yaml.load(path.read_bytes(), Loader=_Loader)
 
         if not isinstance(config, dict):
             logger.warning("Configuration file %s is empty or invalid", path)
             config = {}
 
+        _CACHE[key] = config
+        if len(_CACHE) > _CACHE_SIZE:
+            del _CACHE[next(iter(_CACHE))]
+
         logger.info("Loaded configuration from %s", path)
-        return config
+        return copy.deepcopy(config)
 
     except yaml.YAMLError as err:
         logger.error("Error parsing YAML configuration file %s: %s", path, err)
@@ -63,10 +99,15 @@ def save_config(config: Dict[str, Any], config_path: str) -> None:
         OSError: If there's an error writing to the file
     """
     path = Path(config_path)
+    _forget(str(path.resolve()))
+
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
         with open(path, 'w', encoding='utf-8') as file:
-            yaml.safe_dump(config, file, default_flow_style=False)
+            # No line wrapping, \u escaping or key sorting: less emitter work,
+            # and keys keep the order they were loaded in
+            yaml.dump(config, file, Dumper=_Dumper, default_flow_style=False,
+                      allow_unicode=True, width=1_000_000_000, sort_keys=False)
         logger.info("Saved configuration to %s", path)
     except Exception as err:
         logger.error("Error saving configuration to %s: %s", path, err)